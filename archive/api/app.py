@@ -1,9 +1,21 @@
+import contextlib
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from archive.api.endpoints import auth, logs, zhi
+from archive.core.api_client import close_redis, get_redis
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 所有请求共享一个Redis连接池
+    get_redis()
+    yield
+    await close_redis()
+
 
-app = FastAPI(title="Zhi Archive")
+app = FastAPI(title="Zhi Archive", lifespan=lifespan)
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(logs.router, prefix="/log", tags=["log"])
 app.include_router(zhi.router, prefix="/zhi", tags=["zhi"])
@@ -10,7 +10,7 @@ class PauseStatus(BaseModel):
     pause: bool
 
 
-from . import core, login  # noqa: E402
+from . import catalog, core, files, login, search  # noqa: E402
 
 router.include_router(
     login.router,
@@ -20,3 +20,15 @@ router.include_router(
     core.router,
     prefix="/core",
 )
+router.include_router(
+    catalog.router,
+    prefix="/catalog",
+)
+router.include_router(
+    search.router,
+    prefix="/search",
+)
+router.include_router(
+    files.router,
+    prefix="/files",
+)
@@ -0,0 +1,82 @@
+from datetime import date, datetime
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+
+from archive.core.catalog import Catalog, get_catalog
+
+router = APIRouter()
+
+
+class CatalogItem(BaseModel):
+    id: str
+    people: str
+    action: str | None
+    target_type: str | None
+    title: str | None
+    url: str | None
+    author: str | None
+    acted_at: datetime | None
+    day: str | None
+    fetched_at: datetime | None
+    archive_dir: str | None
+    files: list[str] | None
+    archived_at: datetime | None
+
+
+class CatalogPage(BaseModel):
+    total: int
+    offset: int
+    limit: int
+    items: list[CatalogItem]
+
+
+class CatalogPeople(BaseModel):
+    people: str
+    items: int
+    archived: int
+    latest: datetime | None
+
+
+def require_catalog() -> Catalog:
+    if catalog := get_catalog():
+        return catalog
+    raise HTTPException(404, "Catalog is not enabled")
+
+
+@router.get("/items", summary="分页查询存档目录", response_model=CatalogPage)
+async def list_items(
+    people: str | None = None,
+    action: str | None = None,
+    target_type: str | None = None,
+    url: str | None = None,
+    since: date | None = Query(None, description="动态日期不早于"),
+    until: date | None = Query(None, description="动态日期不晚于"),
+    archived: bool | None = Query(None, description="是否已存档，不传则不限"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=200),
+):
+    total, items = await require_catalog().query(
+        people=people,
+        action=action,
+        target_type=target_type,
+        url=url,
+        since=since,
+        until=until,
+        archived=archived,
+        offset=offset,
+        limit=limit,
+    )
+    return {"total": total, "offset": offset, "limit": limit, "items": items}
+
+
+@router.get("/items/{id_}", summary="存档目录中的一条动态", response_model=CatalogItem)
+async def get_item(id_: str):
+    if item := await require_catalog().get(id_):
+        return item
+    raise HTTPException(404, "Item not found")
+
+
+@router.get("/people", summary="每个用户的动态数和已存档数")
+async def list_people() -> list[CatalogPeople]:
+    return await require_catalog().people()
@@ -9,7 +9,9 @@ from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
 
 from archive.core.api_client import get_api_client
-from archive.core.base import ConfigFilter
+from archive.core.configs import ConfigError
+from archive.core.control import ConfigFilter, WorkStatus
+from archive.core.fleet import ArchiverFleet
 
 from ...render import templates
 from . import PauseStatus
@@ -55,9 +57,77 @@ async def new_state(state: str):
     return {"path": str(task.state_path)}
 
 
+class TaskStats(BaseModel):
+    pending: int
+    processing: int
+    delayed: int
+    dead: int
+
+
+@router.get(
+    "/tasks", summary="存档任务队列状态（所有分片合计）", response_model=TaskStats
+)
+async def task_stats():
+    client = get_api_client()
+    total = TaskStats(pending=0, processing=0, delayed=0, dead=0)
+    for task_queue in client.task_queues:
+        for k, v in (await task_queue.stats()).items():
+            setattr(total, k, getattr(total, k) + v)
+    return total
+
+
+@router.get("/tasks/shards", summary="每个分片的任务队列状态")
+async def shard_task_stats() -> list[TaskStats]:
+    client = get_api_client()
+    return [await task_queue.stats() for task_queue in client.task_queues]
+
+
+@router.get("/tasks/dead", summary="死信列表中的任务")
+async def dead_tasks(start: int = 0, end: int = 99) -> list[str]:
+    client = get_api_client()
+    tasks = []
+    for task_queue in client.task_queues:
+        tasks.extend(await task_queue.dead_tasks())
+    return tasks[start : end + 1 if end >= 0 else None]
+
+
+@router.post("/tasks/dead/requeue", summary="将死信列表中的任务重新入队")
+async def requeue_dead_tasks() -> int:
+    client = get_api_client()
+    return sum([await q.requeue_dead() for q in client.task_queues])
+
+
+@router.delete("/tasks/dead", summary="清空死信列表")
+async def clear_dead_tasks() -> int:
+    client = get_api_client()
+    return sum([await q.clear_dead() for q in client.task_queues])
+
+
+@router.get("/archiver/members", summary="Archiver集群中的成员")
+async def archiver_members() -> list[str]:
+    client = get_api_client(WorkerName.ARCHIVER)
+    return await ArchiverFleet(client.redis, client.members_key).members()
+
+
+@router.get("/monitor/people", summary="多用户监测中的所有用户")
+async def monitor_people() -> list[str]:
+    client = get_api_client(WorkerName.MONITOR)
+    return sorted(await client.redis.smembers(client.people_key))
+
+
+class Status(BaseModel):
+    status: WorkStatus
+
+
+@router.get("/{name}/status", response_model=Status)
+async def status(name: WorkerName, people: str | None = None):
+    client = get_api_client(name, people)
+    return {"status": await client.get_status()}
+
+
 @router.put("/{name}/pause", response_model=PauseStatus)
-async def pause(name: WorkerName, status: PauseStatus):
-    client = get_api_client(name)
+async def pause(name: WorkerName, status: PauseStatus, people: str | None = None):
+    client = get_api_client(name, people)
     if status.pause:
         await client.pause()
     else:
@@ -66,24 +136,31 @@ async def pause(name: WorkerName, status: PauseStatus):
 
 
 @router.get("/{name}/pause", response_model=PauseStatus)
-async def pause_status(name: WorkerName):
-    client = get_api_client(name)
+async def pause_status(name: WorkerName, people: str | None = None):
+    client = get_api_client(name, people)
     return {"pause": await client.need_pause()}
 
 
 @router.get("/{name}/configs")
 async def get_configs(
-    name: WorkerName, filter: ConfigFilter = ConfigFilter.ALL
+    name: WorkerName,
+    filter: ConfigFilter = ConfigFilter.ALL,
+    people: str | None = None,
 ) -> dict[str, Any]:
-    client = get_api_client(name)
-    return await client.configurator.get_configs(filter)
+    client = get_api_client(name, people)
+    return await client.get_configs(filter)
 
 
 @router.put("/{name}/configs")
-async def set_configs(name: WorkerName, configs: dict[str, Any]):
-    client = get_api_client(name)
-    await client.configurator.write_writeable_configs(configs)
-    return await client.configurator.get_configs(ConfigFilter.WRITABLE)
+async def set_configs(
+    name: WorkerName, configs: dict[str, Any], people: str | None = None
+):
+    client = get_api_client(name, people)
+    try:
+        await client.write_writeable_configs(configs)
+    except ConfigError as e:
+        raise HTTPException(422, str(e))
+    return await client.get_configs(ConfigFilter.WRITABLE)
 
 
 @router.get("/config", response_class=HTMLResponse)
@@ -0,0 +1,72 @@
+import mimetypes
+import pathlib
+import re
+
+import aiofiles
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import Response, StreamingResponse
+
+from archive.config import settings
+from archive.core.packs import CHUNK_SIZE, locate
+
+router = APIRouter()
+
+RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+def parse_range(range_: str, size: int) -> tuple[int, int]:
+    """解析单个Range，返回[start, end]"""
+    m = RANGE_RE.match(range_.strip())
+    if not m or not any(m.groups()):
+        raise HTTPException(416, headers={"Content-Range": f"bytes */{size}"})
+    start, end = m.groups()
+    if not start:
+        start, end = max(0, size - int(end)), size - 1
+    else:
+        start, end = int(start), min(int(end) if end else size - 1, size - 1)
+    if start > end:
+        raise HTTPException(416, headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+async def iter_range(path: pathlib.Path, offset: int, size: int):
+    async with aiofiles.open(path, "rb") as fp:
+        await fp.seek(offset)
+        while size > 0:
+            chunk = await fp.read(min(CHUNK_SIZE, size))
+            if not chunk:
+                break
+            size -= len(chunk)
+            yield chunk
+
+
+@router.get("/{path:path}", summary="读取结果目录中的文件（包括已打包的），支持Range")
+async def read_file(path: str, range: str | None = Header(None)):
+    relpath = pathlib.PurePosixPath(path)
+    if relpath.is_absolute() or ".." in relpath.parts:
+        raise HTTPException(400, "Invalid path")
+    location = locate(settings.results_dir, relpath.as_posix())
+    if location is None:
+        raise HTTPException(404, "File not found")
+    file, offset, size = location
+    media_type, encoding = mimetypes.guess_type(relpath.name)
+    if encoding:
+        # 压缩的HTML/MHTML按原样返回
+        media_type = f"application/{encoding}"
+    media_type = media_type or "application/octet-stream"
+    headers = {"Accept-Ranges": "bytes"}
+    if range is None:
+        start, end, status_code = 0, size - 1, 200
+    else:
+        start, end = parse_range(range, size)
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    if size == 0:
+        return Response(b"", media_type=media_type, headers=headers)
+    return StreamingResponse(
+        iter_range(file, offset + start, end - start + 1),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers,
+    )
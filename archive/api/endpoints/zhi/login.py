@@ -8,8 +8,8 @@ from pydantic import BaseModel
 
 from archive.api.render import templates
 from archive.config import settings
-from archive.core.api_client import get_api_client
-from archive.core.login import QRCodeTask, QRCodeTaskStatus, ZhiLoginClient
+from archive.core.api_client import get_api_client, get_login_client
+from archive.core.login_client import QRCodeTask, QRCodeTaskStatus
 
 router = APIRouter()
 
@@ -53,7 +53,7 @@ async def qrcode_info(prefix: str):
 async def new_login_qrcode():
     prefix = os.urandom(10).hex()
     qrcode_task = get_qrcode_task(prefix)
-    client = ZhiLoginClient()
+    client = get_login_client()
     task = await client.new_task(qrcode_task)
     return {"qrcode": get_task_prefix(task)}
 
@@ -73,7 +73,7 @@ async def login_qrcode(prefix: str, timeout: int = 10):
 @router.get("/qrcode/{prefix}/scan_status", response_model=QRCodeScanStatusResponse)
 async def qrcode_scan_status(prefix: str):
     qrcode_task = get_qrcode_task(prefix)
-    client = ZhiLoginClient()
+    client = get_login_client()
     status = await client.get_qrcode_task_status(qrcode_task.task_name)
     return {"status": status}
 
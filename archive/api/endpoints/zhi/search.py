@@ -0,0 +1,52 @@
+from datetime import date
+from enum import Enum
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+
+from .catalog import CatalogItem, require_catalog
+
+router = APIRouter()
+
+
+class SearchOrder(str, Enum):
+    RELEVANCE = "relevance"
+    TIME = "time"
+
+
+class SearchItem(CatalogItem):
+    score: float | None  # 相关度，按时间排序时为空
+
+
+class SearchPage(BaseModel):
+    items: list[SearchItem]
+    next_cursor: str | None  # 下一页游标，为空时没有下一页
+
+
+@router.get("", summary="全文搜索存档的标题和正文", response_model=SearchPage)
+async def search(
+    q: str = Query(..., min_length=1, description="搜索词，多个词以空格分隔"),
+    people: str | None = None,
+    action: str | None = None,
+    target_type: str | None = None,
+    since: date | None = Query(None, description="动态日期不早于"),
+    until: date | None = Query(None, description="动态日期不晚于"),
+    order: SearchOrder = SearchOrder.RELEVANCE,
+    cursor: str | None = Query(None, description="上一页返回的next_cursor"),
+    limit: int = Query(20, ge=1, le=100),
+):
+    try:
+        items, next_cursor = await require_catalog().search_items(
+            q,
+            people=people,
+            action=action,
+            target_type=target_type,
+            since=since,
+            until=until,
+            order=order.value,
+            cursor=cursor,
+            limit=limit,
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
+    return {"items": items, "next_cursor": next_cursor}
@@ -1,12 +1,13 @@
 import pathlib
 from enum import Enum
 
-from pydantic import constr
+from pydantic import constr, model_validator
 from pydantic_settings import BaseSettings
 
 
 class default:  # noqa
     person_page_url = "https://www.zhihu.com/people/{people}"
+    activity_api_url = "https://www.zhihu.com/api/v3/moments/{people}/activities"
 
     activity_item_selector = "div.Profile-main div[role=list] div.List-item"
     target_selector = "div.ContentItem"
@@ -44,11 +45,131 @@ class Settings(BaseSettings):
     browser: Browser = Browser.CHROMIUM
     monitor_fetch_until: int = 1  # days，Monitor运行时默认抓取到1天前的动态
     monitor_interval: int = 60 * 5  # seconds，Monitor默认每5分钟检查一次新的动态
+    # 在一个Monitor进程中同时监测的多个知乎用户，不为空时代替people，如：["someone", "another"]
+    monitor_people: list[str] = []
+    monitor_max_concurrency: int = 2  # 多用户监测时同时抓取的用户数
+    # 根据每个用户的活跃程度自动调整检查间隔（代替monitor_interval）
+    monitor_adaptive_interval: bool = False
+    monitor_min_interval: int = 60  # seconds
+    monitor_max_interval: int = 60 * 30  # seconds
+    # 所有用户合计每分钟最多检查的次数，0表示不限制
+    monitor_polls_per_minute: float = 10
+    # seconds，根据这段时间内的动态估计活跃程度
+    monitor_activity_lookback: int = 60 * 60 * 24 * 7
+    monitor_batch_extract: bool = True  # Monitor通过一次page.evaluate提取所有动态
+    # Monitor抓取方式：dom为解析动态页，api为解析动态接口返回的JSON
+    monitor_fetch_mode: str = "dom"
+    monitor_activity_screenshot: bool = True  # 是否为每条动态截图，仅dom方式有效
+    # Monitor每次运行前先不启动浏览器直接请求动态接口，只有出现新动态时才打开浏览器抓取
+    monitor_fast_poll: bool = False
+    # 存档任务粒度：file为每次抓取的所有动态一个任务（JSON文件），item为每条动态一个任务，迁移见README
+    monitor_task_granularity: str = "file"
+    monitor_save_task_file: bool = True  # item粒度时是否依然保存JSON文件作为记录
+    # 已抓取动态索引：redis, sqlite，留空则不使用
+    # 使用时Monitor会多抓取停止时间前monitor_fetch_overlap秒内的动态并跳过已抓取的，避免遗漏同一时间的多条动态
+    seen_index_backend: str = "redis"
+    seen_index_path: pathlib.Path | None = None  # 默认为results_dir/seen.sqlite3
+    seen_index_retention_days: int = 30
+    monitor_fetch_overlap: int = 60  # seconds
+    # 动态接口地址，可指向本地的替身服务用于测试
+    activity_api_url: str = default.activity_api_url
+    # 页面就绪等待（图片加载、网络空闲、DOM稳定），代替固定的sleep
+    readiness_max_wait: float = 10  # seconds，单次等待的上限
+    # seconds，没有进行中的请求持续该时间视为网络空闲
+    readiness_network_quiet: float = 0.5
+    readiness_dom_quiet: float = 0.3  # seconds，DOM持续该时间没有变化视为稳定
     screenshot_max_page_scroll_height: int = 0  # 截图允许的页面的最大高度，像素值。0表示不限制
+    # Archiver截图方式：full为一次截取整个页面，tiled为按段截取并写入清单，auto为超过阈值时按段截取
+    # 按段截取时不受screenshot_max_page_scroll_height限制，存档中为多张图片，需要时再设置为tiled或auto
+    screenshot_mode: str = "full"
+    screenshot_tile_height: int = 0  # 像素，每段的高度，0表示视口高度
+    screenshot_tile_threshold: int = 10000  # 像素，auto方式下页面高度超过该值时按段截取
+    # 截图编码：png, jpeg, webp。非PNG/JPEG或需要缩放时在进程池中用Pillow重新编码
+    screenshot_format: str = "png"
+    screenshot_quality: int = 80  # 1-100，jpeg和webp有效
+    screenshot_scale: float = 1.0  # 输出图片相对于页面（CSS像素）的缩放比例
+    screenshot_max_width: int = 0  # 像素，超出时等比缩小，0表示不限制
+    screenshot_encode_workers: int = 2  # 每个Worker进程中用于重新编码的进程数
+    # 截图按内容存储在results_dir/blobs中，条目目录中为硬链接，相同的截图只写入一次
+    blob_store_enabled: bool = True
+    # 是否通过感知哈希（dHash）将尺寸相同的近似截图视为重复，汉明距离不超过blob_phash_distance
+    blob_phash: bool = False
+    blob_phash_distance: int = 2
+    # Archiver保存的内容：screenshot为截图，html为正文容器的HTML，mhtml为整个页面的MHTML（仅Chromium），
+    # text为正文纯文本。html和text通过一次page.evaluate提取，只保存文本时不需要截图
+    archive_artifacts: list[str] = ["screenshot", "text"]
+    archive_compression: str = "gzip"  # html和mhtml的压缩方式：gzip, zstd（需要安装zstandard）, none
+    # 存档目录：记录每条动态及存档结果，Monitor和Archiver写入，API查询。可通过rebuild_catalog.py重建
+    catalog_enabled: bool = True
+    catalog_path: pathlib.Path | None = None  # 默认为results_dir/catalog.sqlite3
+    search_enabled: bool = True  # 为存档目录中的标题和正文文本（text）建立全文索引
+    # days，pack_results.py将早于该天数的activities和archives日期目录打包为单个文件
+    pack_after_days: int = 7
+    pack_grace_period: int = 60 * 60  # seconds，该时间内有文件写入的日期目录暂不打包
+    # 结果存储：local为results_dir，s3为S3兼容的对象存储（需要安装aiobotocore），
+    # 使用s3时Worker不需要共享目录，monitor_task_granularity需为item
+    storage_backend: str = "local"
+    s3_endpoint_url: str | None = None  # 如MinIO：http://127.0.0.1:9000，留空为AWS S3
+    s3_bucket: str = "zhi-archive"
+    s3_prefix: str = ""  # 对象键的前缀
+    s3_access_key: str | None = None
+    s3_secret_key: str | None = None
+    s3_region: str | None = None
+    s3_part_size: int = 8 * 1024 * 1024  # bytes，分段上传每段的大小，不小于5MiB
+    s3_max_inflight_parts: int = 4  # 每个对象同时上传的段数
+    # 资源加载策略，Monitor和Archiver打开页面时拦截以下请求（图片不会被拦截）
+    blocked_resource_types: list[str] = ["font", "media"]
+    blocked_url_keywords: list[str] = [
+        "zhihu-web-analytics.zhihu.com",
+        "hm.baidu.com",
+        "google-analytics.com",
+        "googletagmanager.com",
+    ]
+    archiver_concurrency: int = 1  # Archiver在同一上下文中同时打开的标签页数
+    # Archiver每秒最多开始存档的条目数（同一进程的Archiver共享），0表示不限制
+    archiver_rate_limit: float = 1
+    # 存档任务队列
+    # seconds，任务取出后未确认完成的超时时间，超时后重新入队
+    task_visibility_timeout: int = 60 * 10
+    task_max_retries: int = 3  # 任务最多重试次数，超出后移入死信列表
+    # seconds，第n次重试前等待task_retry_backoff * 2^(n-1)秒
+    task_retry_backoff: int = 60
+    # seconds，每个进程检查可见性超时任务的间隔（需要读取所有处理中的任务）
+    task_reap_interval: int = 30
+    task_block_timeout: int = 30  # seconds，Archiver阻塞等待新任务的最长时间
+    # 任务按用户分片到多个队列，由所有Archiver进程分配消费，所有进程需保持一致
+    archive_shards: int = 1
+    # seconds，Archiver集群心跳间隔，超过3倍间隔未心跳视为离开并重新分配分片
+    archiver_heartbeat_interval: int = 10
+    # 进程管理（run_supervisor.py）
+    supervisor_archivers: int = 1  # Archiver进程数
+    # Monitor进程数，monitor_people按进程平均分配，不超过用户数
+    supervisor_monitors: int = 1
+    supervisor_login_worker: bool = True  # 是否同时运行登录Worker
+    supervisor_cpu_affinity: bool = True  # 是否将每个进程绑定到CPU核心（仅Linux）
+    # seconds，子进程异常退出后的重启等待时间，连续崩溃时指数增长至supervisor_restart_backoff_max
+    supervisor_restart_backoff: float = 1
+    supervisor_restart_backoff_max: float = 60
+    # seconds，子进程运行超过该时间后视为正常，重置重启等待时间
+    supervisor_healthy_uptime: int = 60
+    # seconds，收到SIGTERM后等待子进程完成当前任务的最长时间，超时后强制结束
+    supervisor_stop_timeout: int = 60
+    # 浏览器池：在多次循环间复用浏览器上下文，超出以下限制后回收重建，0表示不限制
+    browser_pool_max_pages: int = 200  # 单个上下文最多打开的页面数
+    browser_pool_max_age: int = 60 * 60  # seconds，浏览器及上下文最长存活时间
 
     class Config:
         env_file = ".env"
 
+    @model_validator(mode="after")
+    def default_results_paths(self) -> "Settings":
+        # 按实际的results_dir（如通过环境变量修改）确定默认路径
+        if self.seen_index_path is None:
+            self.seen_index_path = self.results_dir.joinpath("seen.sqlite3")
+        if self.catalog_path is None:
+            self.catalog_path = self.results_dir.joinpath("catalog.sqlite3")
+        return self
+
     @property
     def redis_url(self):
         return f"redis://{self.redis_host}:{self.redis_port}"
@@ -1,13 +1,40 @@
-from archive.core.archiver import Archiver
-from archive.core.base import BaseWorker
-from archive.core.monitor import Monitor
-
-
-def get_api_client(name: str = None, people: str = None):
-    if name == Archiver.name:
-        return Archiver(people)
-    elif name == Monitor.name:
-        return Monitor(people)
-    worker = BaseWorker(people)
-    worker.name = name
-    return worker
+from functools import lru_cache
+
+from redis import asyncio as aioredis
+
+from archive.core import control
+from archive.core.control import WorkerControl
+from archive.core.login_client import ZhiLoginClient
+
+_redis: aioredis.Redis | None = None
+
+
+def get_redis() -> aioredis.Redis:
+    """API进程共享的Redis连接池，随应用启动创建，关闭时释放"""
+    global _redis
+    if _redis is None:
+        _redis = control.get_redis()
+    return _redis
+
+
+async def close_redis():
+    global _redis
+    if _redis is not None:
+        get_api_client.cache_clear()
+        get_login_client.cache_clear()
+        await _redis.connection_pool.disconnect()
+        _redis = None
+
+
+@lru_cache(maxsize=128)
+def get_api_client(name: str = None, people: str = None) -> WorkerControl:
+    """
+    Worker的控制端，Monitor指定`people`时返回按用户区分Redis键的客户端，对应多用户监测中的某个用户
+    """
+    scope = people if name == "monitor" else None
+    return WorkerControl(name, scope=scope, redis=get_redis())
+
+
+@lru_cache(maxsize=None)
+def get_login_client() -> ZhiLoginClient:
+    return ZhiLoginClient(redis=get_redis())
@@ -1,66 +1,213 @@
 import asyncio
+import functools
 import json
+import pathlib
+import time
 from datetime import datetime
-from urllib import parse
 
-import aiofiles
-from playwright.async_api import BrowserContext, Route
+from playwright.async_api import BrowserContext, Page, Route
 
-from archive.config import settings
-from archive.core.base import ActivityItem, BaseWorker, Cfg, TargetType
-from archive.utils.common import dt_fromisoformat, get_validate_filename
+from archive.config import Browser, settings
+from archive.core.base import (
+    AbnormalError,
+    ActivityItem,
+    ArchiveTask,
+    BaseWorker,
+    TargetType,
+)
+from archive.core.catalog import get_catalog
+from archive.core.configs import ARCHIVER_CONFIGURABLE, ScreenshotMode
+from archive.core.fleet import ArchiverFleet
+from archive.core.snapshot import (
+    ANSWER_CONTENT_SELECTORS,
+    ARTICLE_CONTENT_SELECTORS,
+    Artifact,
+    Compression,
+    capture_mhtml,
+    extract_content,
+    wrap_html,
+)
+from archive.utils.common import dt_fromisoformat, get_target_url, get_validate_filename
 from archive.utils.encoder import JSONEncoder
 from archive.utils.js import get_page_scrollHeight, get_page_scrollWidth
+from archive.utils.limiter import RateLimiter
 
 
 class Archiver(BaseWorker):
     name = "archiver"
     output_name = "archives"
-    configurable = BaseWorker.configurable + [
-        Cfg(
-            "screenshot_max_page_scroll_height",
-        )
-    ]
+    configurable = ARCHIVER_CONFIGURABLE
+    # 同一进程内的所有Archiver共享速率限制
+    rate_limiter = RateLimiter(settings.archiver_rate_limit)
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.screenshot_max_page_scroll_height = (
             settings.screenshot_max_page_scroll_height
         )
+        self.screenshot_mode = ScreenshotMode(settings.screenshot_mode)
+        self.screenshot_tile_height = settings.screenshot_tile_height
+        self.screenshot_tile_threshold = settings.screenshot_tile_threshold
+        self.artifacts = settings.archive_artifacts
+        self.compression = Compression.parse(settings.archive_compression)
+        self.concurrency = settings.archiver_concurrency
+        self.fleet = ArchiverFleet(
+            self.redis,
+            self.members_key,
+            shards=len(self.task_queues),
+            logger=self.logger,
+        )
+
+    @property
+    def rate_limit(self) -> float:
+        return self.rate_limiter.rate
+
+    @rate_limit.setter
+    def rate_limit(self, value: float):
+        self.rate_limiter.rate = value
 
-    async def referrer_route(self, route: Route):
+    async def referrer_route(self, route: Route, people: str = None):
         headers = route.request.headers
-        headers["Referer"] = self.person_page_url
+        headers["Referer"] = self.get_person_page_url(people)
         await route.continue_(headers=headers)
 
-    async def store_one(self, item: ActivityItem, context: BrowserContext):
+    async def store_one(
+        self, item: ActivityItem, context: BrowserContext, people: str = None
+    ):
         # 每个对象都新开一个标签页
         target = item["target"]
-        meta = item["meta"]
         if not target["link"]:
             return
-        r = parse.urlparse(target["link"])
-        url = "https://" + "".join(r[1:])
+        url = get_target_url(target["link"])
         page = await self.new_page(context)
-        await page.route(url, self.referrer_route)
+        try:
+            await self._store_page(page, item, url, people)
+        finally:
+            await page.close()
+
+    async def _store_page(
+        self, page: Page, item: ActivityItem, url: str, people: str = None
+    ):
+        target = item["target"]
+        meta = item["meta"]
+        artifacts = {Artifact(a) for a in self.artifacts}
+        await page.route(url, functools.partial(self.referrer_route, people=people))
         await self.goto(page, url)
         if meta["target_type"] == TargetType.ANSWER:
-            imgs_locator = page.locator("div.AnswerCard figure img")
+            image_selector = "div.AnswerCard figure img"
+            content_selectors = ANSWER_CONTENT_SELECTORS
         else:
-            imgs_locator = page.locator("div.Post-RichTextContainer figure img")
-        for i in range(await imgs_locator.count()):
-            img_locator = imgs_locator.nth(i)
-            await img_locator.scroll_into_view_if_needed()
-        await page.wait_for_timeout(timeout=500)
+            image_selector = "div.Post-RichTextContainer figure img"
+            content_selectors = ARTICLE_CONTENT_SELECTORS
+        if not artifacts & {Artifact.SCREENSHOT, Artifact.MHTML}:
+            # 只保存HTML和文本时不需要等待图片加载
+            image_selector = None
+        report = await self.readiness.wait(
+            page, self._page_stats.get(page), image_selector
+        )
+        self.logger.info(f"Page {report}: {url}")
 
         now = datetime.now()
         acted_at = dt_fromisoformat(meta["acted_at"])
         title = get_validate_filename(
             f"{item['meta']['action']}-{item['target']['title']}-{item['id'][:8]}"
         )
-        target_dir = self.get_date_dir(acted_at.date()).joinpath(title)
-        screenshot_path = target_dir.joinpath(f"{title}.png")
+        target_dir = self.get_date_dir(acted_at.date(), people).joinpath(title)
+        files = []
+        if Artifact.SCREENSHOT in artifacts:
+            files.extend(await self.screenshot(page, target_dir, title))
+        paths, text = await self.save_snapshots(
+            page, artifacts, content_selectors, target_dir, title, url
+        )
+        files.extend(paths)
+        info = {
+            "title": target["title"],
+            "url": url,
+            "author": target["author"],
+            "shot_at": now,
+            "files": [path.name for path in files],
+            "item": item,  # 用于重建存档目录
+        }
+        await self.write_bytes(
+            target_dir.joinpath("info.json"),
+            json.dumps(info, ensure_ascii=False, indent=2, cls=JSONEncoder).encode(
+                "utf-8"
+            ),
+        )
+        if catalog := get_catalog():
+            await catalog.add_archive(
+                people or self.people,
+                item,
+                self.storage.url(self.storage_key(target_dir)),
+                info["files"],
+                now,
+                text,
+            )
+
+    async def save_snapshots(
+        self,
+        page: Page,
+        artifacts: set[Artifact],
+        content_selectors: list[str],
+        target_dir: pathlib.Path,
+        title: str,
+        url: str,
+    ) -> tuple[list[pathlib.Path], str | None]:
+        """
+        保存正文容器的HTML（按`compression`压缩）、纯文本和整个页面的MHTML，
+        返回保存的路径及提取的正文文本
+        """
+        paths = []
+        text = None
+        compression = Compression(self.compression)
+        if artifacts & {Artifact.HTML, Artifact.TEXT}:
+            content = await extract_content(page, content_selectors)
+            text = content["text"]
+            if content["selector"] is None:
+                self.logger.warning(f"Content container not found, use body: {url}")
+            if Artifact.HTML in artifacts:
+                data = wrap_html(content["html"], title, url).encode("utf-8")
+                data = await asyncio.to_thread(compression.compress, data)
+                paths.append(
+                    await self.write_bytes(
+                        target_dir.joinpath(f"{title}.html{compression.suffix}"), data
+                    )
+                )
+            if Artifact.TEXT in artifacts:
+                paths.append(
+                    await self.write_bytes(
+                        target_dir.joinpath(f"{title}.txt"), text.encode("utf-8")
+                    )
+                )
+        if Artifact.MHTML in artifacts:
+            if settings.browser != Browser.CHROMIUM:
+                self.logger.warning("MHTML is only supported by Chromium, skipped")
+            else:
+                data = (await capture_mhtml(page)).encode("utf-8")
+                data = await asyncio.to_thread(compression.compress, data)
+                paths.append(
+                    await self.write_bytes(
+                        target_dir.joinpath(f"{title}.mhtml{compression.suffix}"), data
+                    )
+                )
+        if paths:
+            self.logger.info(f"Saved {[path.name for path in paths]} to {target_dir}.")
+        return paths, text
+
+    async def screenshot(
+        self, page: Page, target_dir: pathlib.Path, title: str
+    ) -> list[pathlib.Path]:
+        """截图，返回截图路径，分段截图时为各段和清单的路径"""
         page_scroll_height = await page.evaluate(get_page_scrollHeight)
+        mode = ScreenshotMode(self.screenshot_mode)
+        if mode == ScreenshotMode.AUTO:
+            if page_scroll_height > self.screenshot_tile_threshold:
+                mode = ScreenshotMode.TILED
+            else:
+                mode = ScreenshotMode.FULL
+        if mode == ScreenshotMode.TILED:
+            return await self.screenshot_tiles(page, target_dir, title)
+
         if 0 < self.screenshot_max_page_scroll_height < page_scroll_height:
             page_scroll_width = await page.evaluate(get_page_scrollWidth)
             clip = {
@@ -74,30 +221,60 @@ class Archiver(BaseWorker):
             )
         else:
             clip = None
-        self.logger.info(f"Saving screenshot to {screenshot_path}.")
-        await page.screenshot(
-            path=screenshot_path, type="png", full_page=True, clip=clip
+        screenshot_path = await self.save_screenshot(
+            page, target_dir, title, full_page=True, clip=clip
         )
-        info = {
-            "title": target["title"],
-            "url": url,
-            "author": target["author"],
-            "shot_at": now,
-        }
-        info_path = target_dir.joinpath("info.json")
-        async with aiofiles.open(info_path, "w", encoding="utf-8") as fp:
-            await fp.write(
-                json.dumps(info, ensure_ascii=False, indent=2, cls=JSONEncoder)
+        self.logger.info(f"Saved screenshot to {screenshot_path}.")
+        return [screenshot_path]
+
+    async def screenshot_tiles(
+        self, page: Page, target_dir: pathlib.Path, title: str
+    ) -> list[pathlib.Path]:
+        """
+        分段截图：按`screenshot_tile_height`（默认为视口高度）逐段截取整个页面并依次写入文件，
+        同时写入清单`{title}.tiles.json`，按顺序拼接各段即为完整页面。返回各段和清单的路径
+        """
+        viewport = page.viewport_size or {}
+        tile_height = self.screenshot_tile_height or viewport.get("height") or 1080
+        width = await page.evaluate(get_page_scrollWidth)
+        height = await page.evaluate(get_page_scrollHeight)
+        tiles = []
+        paths = []
+        y = 0
+        while y < height:
+            h = min(tile_height, height - y)
+            path = await self.save_screenshot(
+                page,
+                target_dir,
+                f"{title}.{len(tiles):03d}",
+                full_page=True,
+                clip={"x": 0, "y": y, "width": width, "height": h},
             )
-        await page.keyboard.press("PageDown")
-        await asyncio.sleep(0.5)
-        await page.keyboard.press("PageDown")
+            tiles.append({"file": path.name, "y": y, "height": h})
+            paths.append(path)
+            y += h
+            # 截图过程中页面可能继续变高
+            height = max(height, await page.evaluate(get_page_scrollHeight))
+        # 坐标为页面像素，图片可能按screenshot_encoding缩放
+        manifest = {
+            "width": width,
+            "height": y,
+            "tile_height": tile_height,
+            "tiles": tiles,
+        }
+        manifest_path = await self.write_bytes(
+            target_dir.joinpath(f"{title}.tiles.json"),
+            json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"),
+        )
+        self.logger.info(f"Saved {len(tiles)} screenshot tiles to {target_dir}.")
+        return paths + [manifest_path]
 
     async def store(
         self,
         playwright,
         item_list: list["ActivityItem"],
         headless=True,
+        people: str = None,
         **context_extra,
     ):
         async with self.get_context(
@@ -106,16 +283,132 @@ class Archiver(BaseWorker):
             **context_extra,
         ) as context:
             empty_page = await self.new_page(context)
-            self.logger.info(f"Will fetch {len(item_list)} items")
-            for item in item_list:
-                await self.store_one(item, context)
-                await asyncio.sleep(1)
-            self.logger.info("Fetch done")
-            await empty_page.close()
+            semaphore = asyncio.Semaphore(max(1, self.concurrency))
+            try:
+                return await self.store_items(context, item_list, semaphore, people)
+            finally:
+                await empty_page.close()
+
+    async def store_items(
+        self,
+        context: BrowserContext,
+        item_list: list["ActivityItem"],
+        semaphore: asyncio.Semaphore,
+        people: str = None,
+    ):
+        """在`context`中存档，同时打开的标签页数由`semaphore`限制，可由多个任务共享"""
+        self.logger.info(
+            f"Will fetch {len(item_list)} items, concurrency: {self.concurrency}"
+        )
+        results = await asyncio.gather(
+            *(
+                self._store_one_timed(i, item, context, semaphore, people)
+                for i, item in enumerate(item_list)
+            ),
+            return_exceptions=True,
+        )
+        self.logger.info("Fetch done")
+        # 按任务中的顺序汇报每一项的耗时
+        timings = []
+        errors = []
+        for i, (item, result) in enumerate(zip(item_list, results)):
+            if isinstance(result, BaseException):
+                errors.append(result)
+                self.logger.error(f"[{i}] {item['target']['title']}: {result!r}")
+                timings.append(None)
+            else:
+                timings.append(result)
+        done = [t for t in timings if t is not None]
+        if done:
+            self.logger.info(
+                f"Stored {len(done)}/{len(item_list)} items, "
+                f"total: {sum(done):.2f}s, max: {max(done):.2f}s"
+            )
+        if errors:
+            raise next((e for e in errors if isinstance(e, AbnormalError)), errors[0])
+        return timings
+
+    async def _store_one_timed(
+        self,
+        index: int,
+        item: ActivityItem,
+        context: BrowserContext,
+        semaphore: asyncio.Semaphore,
+        people: str = None,
+    ) -> float:
+        async with semaphore:
+            await self.rate_limiter.wait()
+            start = time.perf_counter()
+            await self.store_one(item, context, people)
+            elapsed = time.perf_counter() - start
+        self.logger.info(f"[{index}] {item['target']['title']}: {elapsed:.2f}s")
+        return elapsed
+
+    async def run(self, *args, **kwargs):
+        # 加入Archiver集群，按成员分配消费的队列分片
+        async with self.fleet.join():
+            await super().run(*args, **kwargs)
 
     async def _run(self, playwright, headless=True, **context_extra):
-        if task := await self.pop_task():
-            self.logger.info(f"New archive task: {task}")
-            async with aiofiles.open(task.activity_path, encoding="utf-8") as fp:
-                item_list = json.loads(await fp.read())
-            await self.store(playwright, item_list, headless, **context_extra)
+        shards = await self.fleet.assigned_shards()
+        if not shards:
+            self.logger.info("No shard assigned, archivers more than shards")
+            return
+        # 单条任务只有一个条目，一次取出至多concurrency个任务并发存档
+        task = await self.pop_task(
+            block_timeout=settings.task_block_timeout, shards=shards
+        )
+        if not task:
+            return
+        tasks = [task]
+        while len(tasks) < self.concurrency and (
+            task := await self.pop_task(shards=shards)
+        ):
+            tasks.append(task)
+        results = None
+        try:
+            async with self.get_context(
+                playwright,
+                browser_headless=headless,
+                **context_extra,
+            ) as context:
+                empty_page = await self.new_page(context)
+                semaphore = asyncio.Semaphore(max(1, self.concurrency))
+                results = await asyncio.gather(
+                    *(self._run_task(task, context, semaphore) for task in tasks),
+                    return_exceptions=True,
+                )
+                await empty_page.close()
+        except BaseException:
+            if results is None:
+                # 任务还未开始处理，放回队列
+                for task in tasks:
+                    await self.release_task(task)
+            raise
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            raise next((e for e in errors if isinstance(e, AbnormalError)), errors[0])
+
+    async def _run_task(
+        self,
+        task: ArchiveTask,
+        context: BrowserContext,
+        semaphore: asyncio.Semaphore,
+    ):
+        """存档一个任务，并单独确认、失败或放回队列"""
+        self.logger.info(f"New archive task: {task}")
+        try:
+            if task.queued_at:
+                self.logger.info(f"Task waited {time.time() - task.queued_at:.2f}s")
+            async with self.task_queues[task.shard].hold(task.as_value()):
+                item_list = await task.load_items()
+                # 单条任务携带所属用户，存档到该用户的目录下
+                await self.store_items(context, item_list, semaphore, task.people)
+        except AbnormalError:
+            # 账号异常与任务本身无关，放回队列等待恢复后重新处理
+            await self.release_task(task)
+            raise
+        except Exception:
+            await self.fail_task(task)
+            raise
+        await self.ack_task(task)
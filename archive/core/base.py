@@ -4,24 +4,44 @@ import json
 import logging
 import os
 import pathlib
+import time
 from datetime import date, datetime
 from enum import Enum
 from functools import lru_cache
-from typing import Any, Callable, Coroutine, TypeAlias, TypedDict
+from typing import Any, Callable, Coroutine, TypedDict
 from urllib import parse
 
+import aiofiles
 from playwright.async_api import (
     Browser,
     BrowserContext,
+    Locator,
     Page,
     Playwright,
+    Request,
     Response,
     Route,
     async_playwright,
 )
 from redis import asyncio as aioredis
+from redis.exceptions import WatchError
 
 from archive.config import default, settings
+from archive.core.browser import BrowserPool
+from archive.core.configs import (  # noqa: F401
+    BASE_CONFIGURABLE,
+    Cfg,
+    Config,
+    ConfigError,
+    parse_config,
+)
+from archive.core.control import ConfigFilter, WorkerControl, WorkerEvent, WorkStatus
+from archive.core.fleet import get_shard
+from archive.core.imaging import ScreenshotEncoding, encode
+from archive.core.policy import PageResourceStats, ResourcePolicy
+from archive.core.queue import TaskQueue
+from archive.core.readiness import PageReadiness
+from archive.core.storage import get_storage
 from archive.env import user_agent
 from archive.utils.common import dt_str
 from archive.utils.encoder import JSONEncoder
@@ -128,85 +148,95 @@ async def get_context(
 
 
 class ArchiveTask:
-    def __init__(self, activity_info_path):
-        self.activity_path = pathlib.Path(activity_info_path).resolve()
+    """
+    存档任务，有两种形式：
+
+    - 文件任务：值为动态列表JSON文件的路径，指定所属用户时为紧凑JSON，如：
+      `{"p":"someone","q":1705486730.1,"f":"/path/to/tasks/xxx.json"}`
+    - 单条任务：值为紧凑JSON，直接携带一条动态及其所属用户和入队时间，如：
+      `{"p":"someone","q":1705486730.1,"i":{...}}`
+
+    `shard`为取出任务的队列分片，确认、失败等操作需回到同一分片
+    """
+
+    def __init__(
+        self,
+        activity_info_path: str | pathlib.Path = None,
+        item: "ActivityItem" = None,
+        people: str = None,
+        queued_at: float = None,
+    ):
+        self.activity_path = (
+            pathlib.Path(activity_info_path).resolve() if activity_info_path else None
+        )
+        self.item = item
+        self.people = people
+        self.queued_at = queued_at
+        self.shard = 0
+        self._value: str | None = None
 
     @property
     def task_name(self):
+        if self.item is not None:
+            return self.item["id"]
         return str(self.activity_path)
 
     def as_value(self) -> str:
-        return f"{self.activity_path}"
+        # 值作为队列中的唯一标识，生成后不再改变
+        if self._value is None:
+            if self.item is None and self.people is None:
+                self._value = f"{self.activity_path}"
+            else:
+                data = {"p": self.people, "q": self.queued_at or time.time()}
+                if self.item is None:
+                    data["f"] = str(self.activity_path)
+                else:
+                    data["i"] = self.item
+                self._value = json.dumps(
+                    data,
+                    ensure_ascii=False,
+                    separators=(",", ":"),
+                    cls=JSONEncoder,
+                )
+        return self._value
 
     @classmethod
     def from_value(cls, v: str) -> "ArchiveTask":
-        return cls(v)
+        if v.startswith("{"):
+            data = json.loads(v)
+            task = cls(
+                data.get("f"),
+                item=data.get("i"),
+                people=data.get("p"),
+                queued_at=data.get("q"),
+            )
+        else:
+            task = cls(v)
+        task._value = v
+        return task
+
+    async def load_items(self) -> list["ActivityItem"]:
+        if self.item is not None:
+            return [self.item]
+        async with aiofiles.open(self.activity_path, encoding="utf-8") as fp:
+            return json.loads(await fp.read())
 
     def __str__(self):
+        if self.item is not None:
+            return f"{self.__class__.__name__}<{self.people}:{self.item['id'][:8]} {self.item['target']['title']}>"
+        if self.people:
+            return f"{self.__class__.__name__}<{self.people}:{self.activity_path}>"
         return f"{self.__class__.__name__}<{self.as_value()}>"
 
     __repr__ = __str__
 
 
-SerializerT: TypeAlias = Callable[[Any], Any]
-
-
-class Config:
-    def __init__(
-        self,
-        name: str,
-        serializer: SerializerT = None,
-        deserializer: SerializerT = None,
-        read_only=False,
-        depend_on: str = None,
-        getter: Callable[["BaseWorker", "Config"], Any] = None,
-    ):
-        self.name = name
-        self.serializer = serializer
-        self.deserializer = deserializer
-        self.read_only = read_only
-        self.depend_on = depend_on
-        self._getter = getter or self.default_getter
-        self._updates = []
-
-    @staticmethod
-    def default_getter(worker: "BaseWorker", cfg: "Config"):
-        return getattr(worker, cfg.name, None)
-
-    def getattr(self, worker: "BaseWorker"):
-        return self._getter(worker, self)
-
-    def to_python(self, value):
-        if self.deserializer:
-            return self.deserializer(value)
-        return value
-
-    def to_jsonable(self, value):
-        if self.serializer:
-            return self.serializer(value)
-        return value
-
-    def __repr__(self):
-        return f"{self.__class__.__name__}<{self.name}>"
-
-
-Cfg = Config
-
-
-class ConfigFilter(str, Enum):
-    ALL = "all"
-    READ_ONLY = "read_only"
-    WRITABLE = "writable"
-
-
-class WorkStatus(str, Enum):
-    RUNNING = "running"  # 正在运行
-    WAITING = "waiting"  # 正在等待下次运行
-
-
 class RedisConfigurator:
     """
     Redis配置
+
+    配置通过API修改后版本号加1并通知Worker，Worker只在收到通知后才重新加载，
+    并记录已加载的版本号，版本号未变化时（如重新订阅通知后）不再重复加载
     """
 
     def __init__(self, worker: "BaseWorker"):
@@ -214,6 +244,13 @@ class RedisConfigurator:
         self.redis = worker.redis
         self.configs_key = worker.configs_key
         self.logger = self.worker.logger
+        self._written: str | None = None  # 最近一次写入的配置，未变化时不再写入
+        self._schema_written = False
+        self._version: int | None = None  # 已加载的配置版本号
+
+    @property
+    def version_key(self):
+        return self.worker.configs_version_key
 
     async def get_configs(self, filter_: ConfigFilter = ConfigFilter.ALL):
         configs = self.worker.get_configs(filter_)
@@ -224,45 +261,80 @@ class RedisConfigurator:
                     configs[key] = all_[key]
         return configs
 
-    async def _write_configs(self, configs: dict[str, Any]):
-        return await self.redis.set(
-            self.configs_key, json.dumps(configs, cls=JSONEncoder)
-        )
+    async def _write_configs(
+        self, configs: dict[str, Any], version: int | None = None
+    ) -> bool:
+        """
+        写入配置，指定`version`时通过WATCH保证只在版本号仍为`version`且期间配置未被修改时写入，
+        否则不写入并返回False
+        """
+        configs_str = json.dumps(configs, cls=JSONEncoder)
+        if configs_str == self._written:
+            return True
+        if version is None:
+            await self.redis.set(self.configs_key, configs_str)
+        else:
+            async with self.redis.pipeline() as pipe:
+                await pipe.watch(self.configs_key, self.version_key)
+                if int(await pipe.get(self.version_key) or 0) != version:
+                    return False
+                pipe.multi()
+                pipe.set(self.configs_key, configs_str)
+                try:
+                    await pipe.execute()
+                except WatchError:
+                    return False
+        self._written = configs_str
+        return True
 
     async def write_writeable_configs(self, configs: dict[str, Any]):
         loaded = self.worker.load_configs(configs)
         all_ = await self.get_configs()
         all_.update(loaded)
-        return await self._write_configs(all_)
-
-    async def sync_from_worker(self):
-        await self._write_configs(self.worker.get_configs(ConfigFilter.ALL))
+        result = await self._write_configs(all_)
+        version = self._version = await self.redis.incr(self.version_key)
+        await self.worker.publish(WorkerEvent.CONFIGS)
+        self.logger.info(f"Configs updated, version: {version}")
+        return result
+
+    async def sync_from_worker(self) -> bool:
+        """将Worker当前的配置写入Redis，已加载的版本之后配置又被修改时不写入并返回False"""
+        configs = self.worker.get_configs(ConfigFilter.ALL)
+        if not await self._write_configs(configs, self._version):
+            self.logger.info("Configs changed since last load, skip writing")
+            return False
+        if not self._schema_written:
+            # 供控制端区分只读配置
+            schema = {c.name: c.read_only for c in self.worker.configurable}
+            await self.redis.set(self.worker.configs_schema_key, json.dumps(schema))
+            self._schema_written = True
+        return True
+
+    async def get_version(self) -> int:
+        return int(await self.redis.get(self.version_key) or 0)
 
     async def load_to_worker(self):
-        configs = await self.get_configs()
-        if not configs:
-            self.logger.info("No configs found in redis.")
-        else:
-            self.worker.load_configs(await self.get_configs())
-        await self.sync_from_worker()
-
-
-class BaseWorker:
-    name = ""
+        while True:
+            # 先读取版本号，期间配置再次修改时写回会失败，重新加载
+            version = await self.get_version()
+            if version == self._version:
+                self.logger.debug(f"Configs unchanged, version: {version}")
+            else:
+                configs = await self.get_configs()
+                if not configs:
+                    self.logger.info("No configs found in redis.")
+                else:
+                    self.worker.load_configs(configs)
+                    self.logger.info(f"Configs loaded, version: {version}")
+                self._version = version
+            if await self.sync_from_worker():
+                return
+
+
+class BaseWorker(WorkerControl):
     output_name = ""
-    redis_key_prefix = "zhi_archive:archive"
-    state_path_key = f"{redis_key_prefix}:state_path"
-    tasks_key = f"{redis_key_prefix}:tasks"  # list
-    tasks_result_key = f"{redis_key_prefix}:task_results"  # hash
     abnormal_texts = ["您的网络环境存在异常", "请输入验证码进行验证", "意见反馈"]
-    configurable: list[Cfg] = [
-        Cfg("people"),
-        Cfg("page_default_timeout"),
-        Cfg("interval"),
-        Cfg("person_page_url", read_only=True, depend_on="people"),
-        Cfg("results_dir", str, read_only=True, depend_on="people"),
-        Cfg("tasks_dir", str, read_only=True, depend_on="people"),
-    ]
+    configurable: list[Cfg] = BASE_CONFIGURABLE
 
     def __init__(
         self,
@@ -272,21 +344,40 @@ class BaseWorker:
         base_results_dir: str | pathlib.Path = None,
         redis_url: str = settings.redis_url,
         interval: int = 10,
+        scope: str = None,
+        redis: aioredis.Redis = None,
     ):
+        super().__init__(scope=scope, redis=redis, redis_url=redis_url)
         self.people = people or settings.people
         self.init_state_path = init_state_path or settings.states_dir.joinpath(
             default.state_file
         )
         self.page_default_timeout = page_default_timeout
         self._base_results_dir = base_results_dir or settings.results_dir
-        self.redis = aioredis.from_url(
-            redis_url,
-            password=settings.redis_passwd,
-            encoding="utf-8",
-            decode_responses=True,
-        )
+        self.storage = get_storage(self._base_results_dir)
         self.interval = interval
-        self.logger = logging.getLogger(self.name or "default")
+        self._pop_cursor = 0
+        self.logger = logging.getLogger(
+            f"{self.name}.{scope}" if scope else self.name or "default"
+        )
+        self.browser_pool: BrowserPool | None = None
+        # 多个Worker共享浏览器池时，限制同时运行的数量
+        self.run_limiter: asyncio.Semaphore | None = None
+        # 由Redis发布的事件维护的本地状态，见`listen_events`
+        self._paused = True
+        self._resumed = asyncio.Event()
+        self._configs_dirty = False
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self.resource_policy = ResourcePolicy(
+            blocked_resource_types=settings.blocked_resource_types,
+            blocked_url_keywords=settings.blocked_url_keywords,
+        )
+        self._page_stats: dict[Page, PageResourceStats] = {}
+        # 页面 -> 打开页面的Worker，共享浏览器上下文时按该Worker的资源加载策略拦截请求
+        self._page_workers: dict[Page, "BaseWorker"] = {}
+        self.readiness = PageReadiness()
+        self.screenshot_encoding = ScreenshotEncoding.from_settings()
         self.init_configurable()
         self.configurator = RedisConfigurator(self)
 
@@ -294,7 +385,9 @@ class BaseWorker:
         name_to_cfg = {cfg.name: cfg for cfg in self.configurable}
         for cfg in self.get_configurable(filter_=ConfigFilter.READ_ONLY):
             if cfg.depend_on and cfg.depend_on in name_to_cfg:
-                name_to_cfg[cfg.depend_on]._updates.append(cfg)
+                updates = name_to_cfg[cfg.depend_on]._updates
+                if cfg not in updates:
+                    updates.append(cfg)
 
     @property
     def personal_key(self):
@@ -302,32 +395,14 @@ class BaseWorker:
 
     @property
     def person_page_url(self):
-        return default.person_page_url.format(people=self.people)
-
-    @property
-    def status_key(self):
-        return f"{self.redis_key_prefix}:{self.name}:status"
-
-    async def get_status(self) -> WorkStatus:
-        return WorkStatus(await self.redis.get(self.status_key) or WorkStatus.WAITING)
+        return self.get_person_page_url()
 
-    async def set_status(self, status: WorkStatus):
-        return await self.redis.set(self.status_key, status.value)
-
-    async def get_state_path_from_redis(self) -> pathlib.Path | None:
-        path = await self.redis.get(self.state_path_key)
-        return pathlib.Path(path) if path else None
-
-    async def set_state_path_to_redis(self, path: str | pathlib.Path):
-        await self.redis.set(self.state_path_key, str(path))
+    def get_person_page_url(self, people: str = None):
+        return default.person_page_url.format(people=people or self.people)
 
     async def get_state_path(self) -> pathlib.Path | str:
         return await self.get_state_path_from_redis() or self.init_state_path
 
-    @property
-    def configs_key(self):
-        return f"{self.redis_key_prefix}:{self.name}:configs"
-
     @lru_cache(None)
     def get_configurable(self, filter_: ConfigFilter = ConfigFilter.ALL):
         if filter_ == ConfigFilter.ALL:
@@ -345,54 +420,168 @@ class BaseWorker:
         return configs
 
     def load_configs(self, configs: dict[str, Any]):
+        """加载可修改的配置，跳过无效的值并保留当前值"""
         loaded = {}
         for c in self.get_configurable(ConfigFilter.WRITABLE):
             if c.name in configs:
-                setattr(self, c.name, c.to_python(configs[c.name]))
+                try:
+                    value = parse_config(c, configs[c.name])
+                except ConfigError as e:
+                    self.logger.error(f"{e}, keep {c.to_jsonable(c.getattr(self))!r}")
+                    continue
+                setattr(self, c.name, value)
                 loaded[c.name] = configs[c.name]
                 if c._updates:
                     for cfg in c._updates:
                         loaded[cfg.name] = cfg.to_jsonable(cfg.getattr(self))
         return loaded
 
+    def get_task_queue(self, people: str = None) -> TaskQueue:
+        """用户任务所在的队列分片"""
+        return self.task_queues[get_shard(people or self.people, len(self.task_queues))]
+
     async def push_task(self, task: ArchiveTask):
-        return await self.redis.rpush(self.tasks_key, task.as_value())
+        return await self.get_task_queue(task.people).push(task.as_value())
+
+    async def push_tasks(self, tasks: list[ArchiveTask]):
+        grouped: dict[int, list[str]] = {}
+        for task in tasks:
+            shard = get_shard(task.people or self.people, len(self.task_queues))
+            grouped.setdefault(shard, []).append(task.as_value())
+        for shard, values in grouped.items():
+            await self.task_queues[shard].push(*values)
+
+    async def pop_task(
+        self, block_timeout: int = 0, shards: list[int] = None
+    ) -> ArchiveTask | None:
+        """
+        依次从`shards`（默认所有分片）中取出任务，都没有任务时轮流阻塞等待其中一个分片
+        """
+        if shards is None:
+            shards = list(range(len(self.task_queues)))
+        if not shards:
+            return None
+        value = shard = None
+        for shard in shards:
+            if value := await self.task_queues[shard].pop():
+                break
+        if value is None and block_timeout > 0:
+            shard = shards[self._pop_cursor % len(shards)]
+            self._pop_cursor += 1
+            value = await self.task_queues[shard].pop(
+                max(1, block_timeout // len(shards))
+            )
+        if value is None:
+            return None
+        task = ArchiveTask.from_value(value)
+        task.shard = shard
+        return task
+
+    async def ack_task(self, task: ArchiveTask):
+        await self.task_queues[task.shard].ack(task.as_value())
+
+    async def fail_task(self, task: ArchiveTask) -> bool:
+        return await self.task_queues[task.shard].fail(task.as_value())
+
+    async def release_task(self, task: ArchiveTask):
+        await self.task_queues[task.shard].release(task.as_value())
 
-    async def pop_task(self) -> ArchiveTask | None:
-        task = await self.redis.lpop(self.tasks_key)
-        if task:
-            return ArchiveTask.from_value(task)
+    def get_results_dir(self, people: str = None) -> pathlib.Path:
+        r = self._base_results_dir.joinpath(people or self.people, self.output_name)
+        if self.storage.local:
+            os.makedirs(r, exist_ok=True)
+        return r
 
     @property
     def results_dir(self):
-        r = self._base_results_dir.joinpath(self.people, self.output_name)
-        os.makedirs(r, exist_ok=True)
-        return r
+        return self.get_results_dir()
 
     @property
     def tasks_dir(self):
         r = self._base_results_dir.joinpath(self.people, "tasks")
-        os.makedirs(r, exist_ok=True)
+        if self.storage.local:
+            os.makedirs(r, exist_ok=True)
         return r
 
-    def get_date_dir(self, dt: date) -> pathlib.Path:
-        date_dir = self.results_dir.joinpath(dt.strftime("%Y/%m/%d"))
-        os.makedirs(date_dir, exist_ok=True)
+    def get_date_dir(self, dt: date, people: str = None) -> pathlib.Path:
+        date_dir = self.get_results_dir(people).joinpath(dt.strftime("%Y/%m/%d"))
+        if self.storage.local:
+            os.makedirs(date_dir, exist_ok=True)
         return date_dir
 
+    def storage_key(self, path: pathlib.Path) -> str:
+        """结果目录中的路径对应的存储键"""
+        return path.relative_to(self._base_results_dir).as_posix()
+
     @classmethod
     def batch_url_match(cls, url: str) -> bool:
         if "zhihu-web-analytics.zhihu.com" in url:
             return True
         return False
 
+    def get_resource_policy(self, request: Request) -> ResourcePolicy:
+        with contextlib.suppress(Exception):
+            if worker := self._page_workers.get(request.frame.page):
+                return worker.resource_policy
+        return self.resource_policy
+
+    async def resource_route(self, route: Route):
+        request = route.request
+        policy = self.get_resource_policy(request)
+        if policy.enabled and (
+            self.batch_url_match(request.url) or policy.should_block(request)
+        ):
+            with contextlib.suppress(Exception):
+                if stats := self._page_stats.get(request.frame.page):
+                    stats.on_blocked(request)
+            await route.abort("blockedbyclient")
+        else:
+            await route.fallback()
+
+    def _on_page_close(self, page: Page):
+        self._page_workers.pop(page, None)
+        if stats := self._page_stats.pop(page, None):
+            self.logger.info(f"Page closed, {stats}: {page.url}")
+
+    async def save_screenshot(
+        self, target: Page | Locator, directory: pathlib.Path, name: str, **kwargs
+    ) -> pathlib.Path:
+        """
+        按`screenshot_encoding`截图并保存为`directory/name.<格式后缀>`，返回实际保存的路径
+        """
+        encoding = self.screenshot_encoding
+        suffix = encoding.suffix
+        data = await target.screenshot(**encoding.screenshot_options(), **kwargs)
+        if not encoding.native:
+            data, suffix = await encode(data, encoding)
+        return await self.write_bytes(
+            directory.joinpath(f"{name}{suffix}"), data, dedupe=True
+        )
+
+    async def write_bytes(
+        self, path: pathlib.Path, data: bytes, dedupe: bool = False
+    ) -> pathlib.Path:
+        """
+        写入结果目录中的`path`，实际写入位置由`storage`决定，`dedupe`为截图，按内容去重
+        """
+        await self.storage.write(self.storage_key(path), data, dedupe)
+        return path
+
     async def new_page(self, context: BrowserContext) -> Page:
         page = await context.new_page()
         page.set_default_timeout(self.page_default_timeout)
+        stats = self._page_stats[page] = PageResourceStats()
+        self._page_workers[page] = self
+        page.on("request", stats.on_request)
+        page.on("requestfinished", stats.on_request_done)
+        page.on("requestfailed", stats.on_request_done)
+        page.on("response", stats.on_response)
+        page.on("close", self._on_page_close)
         return page
 
     async def init_context(self, context: BrowserContext) -> BrowserContext:
         await init_context(context)
+        await context.route("**/*", self.resource_route)
         return context
 
     @contextlib.asynccontextmanager
@@ -405,6 +594,12 @@ class BaseWorker:
     ) -> BrowserContext:
         state_path = await self.get_state_path()
         self.logger.info(f"Currently used state path: {state_path}")
+        if self.browser_pool:
+            async with self.browser_pool.context(
+                state_path, state_auto_save
+            ) as context:
+                yield context
+            return
         async with get_context(
             playwright,
             state_path,
@@ -419,9 +614,9 @@ class BaseWorker:
         self.logger.info(f"Goto: {url}")
         response = await page.goto(url, **kwargs)
         if await self.is_abnormal(response):
-            await page.screenshot(
-                path=settings.results_dir.joinpath(f"异常{dt_str()}.png"),
-                full_page=True,
+            await self.write_bytes(
+                self._base_results_dir.joinpath(f"异常{dt_str()}.png"),
+                await page.screenshot(full_page=True),
             )
             raise AbnormalError(f"{url}: \n{await response.text()}")
         return response
@@ -437,60 +632,161 @@ class BaseWorker:
         self.logger.info("出现异常，暂停运行")
         await self.pause()
 
-    @property
-    def pause_key(self):
-        return f"{self.redis_key_prefix}:{self.name}:pause"
-
     async def pause(self):
-        return await self.redis.set(self.pause_key, 1)
+        self._set_paused(True)
+        return await super().pause()
 
-    async def resume(self):
-        return await self.redis.set(self.pause_key, 0)
+    def _set_paused(self, paused: bool):
+        self._paused = paused
+        if paused:
+            self._resumed.clear()
+        else:
+            self._resumed.set()
+
+    async def refresh_pause(self):
+        self._set_paused(await self.need_pause())
+
+    def handle_event(self, event: str):
+        self.logger.debug(f"Received event: {event}")
+        if event == WorkerEvent.PAUSE:
+            self._set_paused(True)
+        elif event == WorkerEvent.RESUME:
+            self._set_paused(False)
+        elif event == WorkerEvent.CONFIGS:
+            self._configs_dirty = True
+            self._wakeup.set()
+
+    async def listen_events(self):
+        """
+        订阅暂停、恢复和配置变更事件，断线重连后重新读取一次状态，避免错过通知
+        """
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.events_channel)
+                    self._configs_dirty = True
+                    await self.refresh_pause()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.handle_event(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.exception(e)
+                await asyncio.sleep(1)
 
-    async def need_pause(self) -> bool:
-        return int(await self.redis.get(self.pause_key) or 1) == 1
+    @property
+    def stopping(self) -> bool:
+        return self._stopping.is_set()
+
+    def stop(self):
+        """优雅退出：完成当前循环后不再继续，并唤醒暂停和等待中的Worker"""
+        self.logger.info(f"{self.name} stopping")
+        self._stopping.set()
+        self._resumed.set()
+        self._wakeup.set()
+
+    async def wait_resumed(self, check_interval: int = 60):
+        while self._paused and not self.stopping:
+            try:
+                await asyncio.wait_for(self._resumed.wait(), timeout=check_interval)
+            except asyncio.TimeoutError:
+                # 兜底：定期从Redis确认一次
+                await self.refresh_pause()
+
+    async def wait_next(self, timeout: float = None):
+        """等待下次运行（默认`interval`秒），配置变更或退出时提前唤醒"""
+        if self.stopping:
+            return
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(
+                self._wakeup.wait(),
+                timeout=self.interval if timeout is None else timeout,
+            )
+            if not self.stopping:
+                self.logger.info("Configs changed, wake up")
+        except asyncio.TimeoutError:
+            pass
 
     async def _run(self, playwright, headless=True, **context_extra):
         raise NotImplementedError
 
+    async def cleanup(self):
+        """Worker退出时释放自身的资源，在浏览器关闭前调用"""
+
     async def before_run(self):
         self.logger.debug("Before run")
-        await self.configurator.load_to_worker()
+        if self._configs_dirty:
+            self._configs_dirty = False
+            self.logger.info("Reload configs from redis")
+            await self.configurator.load_to_worker()
 
     async def after_run(self):
         self.logger.debug("After run")
-        self.logger.debug("Write all configs to redis")
-        await self.configurator.sync_from_worker()
+        if self._configs_dirty:
+            # 运行期间配置被修改，先加载，避免覆盖
+            self._configs_dirty = False
+            await self.configurator.load_to_worker()
+        else:
+            self.logger.debug("Write all configs to redis")
+            if not await self.configurator.sync_from_worker():
+                # 通知还未到达，配置已被修改
+                await self.configurator.load_to_worker()
 
     @contextlib.asynccontextmanager
     async def rotate(self):
-        if await self.need_pause():
+        if self._paused:
             self.logger.info(f"{self.name} pausing")
-            while await self.need_pause():
-                await asyncio.sleep(1)
+            await self.wait_resumed()
             self.logger.info(f"{self.name} resumed")
         await self.before_run()
         await self.set_status(WorkStatus.RUNNING)
         yield
         await self.set_status(WorkStatus.WAITING)
         await self.after_run()
-        await asyncio.sleep(self.interval)
+        await self.wait_next()
 
     async def run(
         self,
         headless=True,
+        browser_pool: BrowserPool = None,
         **context_extra,
     ):
         self.logger.info(f"{self.name} started.")
         await self.configurator.load_to_worker()
-        while True:
-            async with async_playwright() as playwright:
+        await self.refresh_pause()
+        events_listener = asyncio.create_task(self.listen_events())
+        async with contextlib.AsyncExitStack() as stack:
+            stack.callback(events_listener.cancel)
+            if browser_pool is None:
+                playwright = await stack.enter_async_context(async_playwright())
+                # 浏览器按需启动，并在多次循环间复用
+                browser_pool = BrowserPool(
+                    playwright,
+                    browser_headless=headless,
+                    init=self.init_context,
+                    logger=self.logger,
+                    **context_extra,
+                )
+                stack.push_async_callback(browser_pool.close)
+            stack.push_async_callback(self.storage.close)
+            stack.push_async_callback(self.cleanup)
+            self.browser_pool = browser_pool
+            stack.callback(setattr, self, "browser_pool", None)
+            while not self.stopping:
                 async with self.rotate():
-                    try:
-                        self.logger.debug(f"{self.name}: New loop")
-                        await self._run(playwright, headless, **context_extra)
-                    except AbnormalError as e:
-                        self.logger.error(e)
-                        await self.handle_abnormal()
-                    except Exception as e:
-                        self.logger.exception(e)
+                    if self.stopping:
+                        break
+                    async with self.run_limiter or contextlib.nullcontext():
+                        try:
+                            self.logger.debug(f"{self.name}: New loop")
+                            await self._run(
+                                browser_pool.playwright, headless, **context_extra
+                            )
+                        except AbnormalError as e:
+                            self.logger.error(e)
+                            await self.handle_abnormal()
+                        except Exception as e:
+                            self.logger.exception(e)
+            self.logger.info(f"{self.name} stopped.")
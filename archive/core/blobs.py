@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import logging
+import os
+import pathlib
+import sqlite3
+import time
+from functools import lru_cache
+
+from archive.config import settings
+from archive.core.imaging import image_hash
+
+logger = logging.getLogger("default")
+
+
+class BlobStore:
+    """
+    内容寻址存储：截图按sha256存储为`root/ab/cd/<sha256><后缀>`，相同内容只写入一次
+
+    条目目录中的文件是blob的硬链接，无法创建硬链接（如跨文件系统）时写入副本。
+    `index.sqlite3`记录所有blob及链接到它们的路径。
+    开启`phash`时，对尺寸相同且差异哈希的汉明距离不超过`phash_distance`的图片复用已有的blob。
+    """
+
+    def __init__(
+        self,
+        root: str | pathlib.Path,
+        phash: bool = False,
+        phash_distance: int = 2,
+    ):
+        self.root = pathlib.Path(root)
+        self.phash = phash
+        self.phash_distance = phash_distance
+        self._conn: sqlite3.Connection | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def index_path(self) -> pathlib.Path:
+        return self.root.joinpath("index.sqlite3")
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.index_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # 打包等其他进程同时写入
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                "digest TEXT PRIMARY KEY, suffix TEXT NOT NULL, size INTEGER NOT NULL, "
+                "phash INTEGER, width INTEGER, height INTEGER, created_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS blobs_dimension "
+                "ON blobs (suffix, width, height)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS links ("
+                "path TEXT PRIMARY KEY, digest TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS links_digest ON links (digest)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def blob_path(self, digest: str, suffix: str) -> pathlib.Path:
+        return self.root.joinpath(digest[:2], digest[2:4], f"{digest}{suffix}")
+
+    def _get_suffix(self, digest: str) -> str | None:
+        row = (
+            self._connect()
+            .execute("SELECT suffix FROM blobs WHERE digest = ?", (digest,))
+            .fetchone()
+        )
+        return row[0] if row else None
+
+    def find_blob(self, digest: str) -> pathlib.Path | None:
+        """内容为`digest`的blob，不存在时为None"""
+        suffix = self._get_suffix(digest)
+        if suffix is None:
+            return None
+        path = self.blob_path(digest, suffix)
+        return path if path.is_file() else None
+
+    def move_links(self, moves: dict[pathlib.Path, str]):
+        """
+        链接的文件被打包后，将链接记录改为包内的位置（`<包>#<包内路径>`），blob依然被引用
+        """
+        conn = self._connect()
+        conn.executemany(
+            "UPDATE links SET path = ? WHERE path = ?",
+            [(new, str(old)) for old, new in moves.items()],
+        )
+        conn.commit()
+
+    def _find_similar(
+        self, suffix: str, phash: int, width: int, height: int
+    ) -> str | None:
+        rows = self._connect().execute(
+            "SELECT digest, phash FROM blobs "
+            "WHERE suffix = ? AND width = ? AND height = ? AND phash IS NOT NULL",
+            (suffix, width, height),
+        )
+        for digest, other in rows:
+            # SQLite整数为有符号64位
+            if bin((phash ^ other) & 0xFFFFFFFFFFFFFFFF).count("1") <= (
+                self.phash_distance
+            ):
+                return digest
+        return None
+
+    def _write_blob(
+        self,
+        digest: str,
+        suffix: str,
+        data: bytes,
+        phash: int | None,
+        width: int | None,
+        height: int | None,
+    ):
+        path = self.blob_path(digest, suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        if phash is not None and phash >= 1 << 63:
+            phash -= 1 << 64
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR IGNORE INTO blobs "
+            "(digest, suffix, size, phash, width, height, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (digest, suffix, len(data), phash, width, height, time.time()),
+        )
+        conn.commit()
+
+    def _link(self, digest: str, suffix: str, path: pathlib.Path):
+        blob = self.blob_path(digest, suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.unlink(missing_ok=True)
+        try:
+            os.link(blob, path)
+        except OSError:
+            path.write_bytes(blob.read_bytes())
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO links (path, digest, created_at) VALUES (?, ?, ?)",
+            (str(path), digest, time.time()),
+        )
+        conn.commit()
+
+    async def store(self, path: pathlib.Path, data: bytes) -> pathlib.Path:
+        """
+        保存`data`到`path`，内容已存在时只创建链接，返回`path`
+
+        blob保留首次写入时的后缀，之后相同内容的文件后缀不同时依然链接到该blob
+        """
+        suffix = path.suffix
+        digest = hashlib.sha256(data).hexdigest()
+        phash = width = height = None
+        async with self._lock:
+            existing = await asyncio.to_thread(self._get_suffix, digest)
+        if existing is None and self.phash:
+            phash, width, height = await image_hash(data)
+        async with self._lock:
+            if existing is None and phash is not None:
+                signed = phash - (1 << 64) if phash >= 1 << 63 else phash
+                similar = await asyncio.to_thread(
+                    self._find_similar, suffix, signed, width, height
+                )
+                if similar:
+                    logger.info(f"Similar blob {similar[:12]} reused: {path}")
+                    digest = similar
+                    existing = await asyncio.to_thread(self._get_suffix, digest)
+            if existing is None:
+                await asyncio.to_thread(
+                    self._write_blob, digest, suffix, data, phash, width, height
+                )
+            else:
+                logger.info(f"Duplicate blob {digest[:12]} skipped: {path}")
+                suffix = existing
+            await asyncio.to_thread(self._link, digest, suffix, path)
+        return path
+
+
+@lru_cache
+def get_blob_store() -> BlobStore | None:
+    """同一进程中的Worker共享一个BlobStore，未开启时为None"""
+    if not settings.blob_store_enabled:
+        return None
+    return BlobStore(
+        settings.results_dir.joinpath("blobs"),
+        settings.blob_phash,
+        settings.blob_phash_distance,
+    )
@@ -0,0 +1,243 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import time
+from typing import Any, Callable, Coroutine
+
+from playwright.async_api import Browser, BrowserContext, Page, Playwright
+
+from archive.config import settings
+from archive.env import user_agent
+
+InitT = Callable[[BrowserContext], Coroutine[Any, Any, BrowserContext]]
+
+
+def get_state_mtime(state_path: str | pathlib.Path) -> float | None:
+    try:
+        return os.stat(state_path).st_mtime
+    except OSError:
+        return None
+
+
+def get_state_digest(state_path: str | pathlib.Path) -> str | None:
+    """state文件中cookies的摘要，不包含过期时间和localStorage"""
+    try:
+        with open(state_path, "rb") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    cookies = sorted(
+        (c.get("domain"), c.get("path"), c.get("name"), c.get("value"))
+        for c in state.get("cookies") or []
+    )
+    return hashlib.sha256(json.dumps(cookies).encode()).hexdigest()
+
+
+class StateVersion:
+    """
+    记录state文件的版本
+
+    先比较mtime，mtime变化时再比较cookies的摘要，
+    其他进程自动保存了内容相同的state（只刷新了过期时间等）不算作变化。
+    """
+
+    def __init__(self, state_path: str | pathlib.Path):
+        self.state_path = state_path
+        self.refresh()
+
+    def refresh(self):
+        self.mtime = get_state_mtime(self.state_path)
+        self.digest = get_state_digest(self.state_path)
+
+    def changed(self) -> bool:
+        mtime = get_state_mtime(self.state_path)
+        if mtime == self.mtime:
+            return False
+        if get_state_digest(self.state_path) != self.digest:
+            return True
+        self.mtime = mtime
+        return False
+
+
+class PooledContext:
+    def __init__(self, context: BrowserContext, state_path: str | pathlib.Path):
+        self.context = context
+        self.state_path = state_path
+        self.state_version = StateVersion(state_path)
+        self.created_at = time.monotonic()
+        self.pages = 0  # 累计打开过的页面数
+        self.in_use = 0
+        self.retired = False
+        context.on("page", self._on_page)
+
+    def _on_page(self, page: Page):
+        self.pages += 1
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+    def state_changed(self) -> bool:
+        return self.state_version.changed()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}<{self.state_path}, pages={self.pages}, age={self.age:.0f}s>"
+
+
+class BrowserPool:
+    """
+    浏览器池
+
+    在Worker的多次循环之间复用同一个浏览器和已初始化(stealth)的上下文，
+    上下文打开的页面数或存活时间超出限制后回收，state文件中的cookies变化时重新创建。
+    """
+
+    def __init__(
+        self,
+        playwright: Playwright,
+        browser_headless=True,
+        init: InitT | None = None,
+        max_pages: int = settings.browser_pool_max_pages,
+        max_age: int = settings.browser_pool_max_age,
+        locale="zh-CN",
+        logger: logging.Logger = None,
+        **context_extra,
+    ):
+        self.playwright = playwright
+        self.browser_headless = browser_headless
+        self.init = init
+        self.max_pages = max_pages
+        self.max_age = max_age
+        self.locale = locale
+        self.context_extra = context_extra
+        self.logger = logger or logging.getLogger("default")
+        self._browser: Browser | None = None
+        self._browser_launched_at = 0.0
+        self._contexts: dict[str, PooledContext] = {}
+        self._in_use = 0
+        self._lock = asyncio.Lock()
+
+    def expired(self, pooled: PooledContext) -> bool:
+        if 0 < self.max_pages <= pooled.pages:
+            return True
+        if 0 < self.max_age <= pooled.age:
+            return True
+        return False
+
+    async def get_browser(self) -> Browser:
+        if self._browser and self._browser.is_connected():
+            browser_age = time.monotonic() - self._browser_launched_at
+            if not self._in_use and 0 < self.max_age <= browser_age:
+                self.logger.info(f"Browser is {browser_age:.0f}s old, relaunch it")
+                await self._browser.close()
+                self._browser = None
+        if not self._browser or not self._browser.is_connected():
+            self.logger.info(f"Launch browser: {settings.browser.value}")
+            self._browser = await getattr(
+                self.playwright, settings.browser.value
+            ).launch(headless=self.browser_headless)
+            self._browser_launched_at = time.monotonic()
+            self._contexts.clear()
+        return self._browser
+
+    async def _new_context(self, state_path: str | pathlib.Path) -> PooledContext:
+        browser = await self.get_browser()
+        context = await browser.new_context(
+            storage_state=state_path,
+            locale=self.locale,
+            **self.context_extra,
+            user_agent=user_agent,
+        )
+        if self.init:
+            await self.init(context)
+        pooled = PooledContext(context, state_path)
+        self.logger.info(f"New browser context: {pooled}")
+        return pooled
+
+    async def _close_context(self, pooled: PooledContext):
+        self.logger.info(f"Close browser context: {pooled}")
+        with contextlib.suppress(Exception):
+            await pooled.context.close()
+
+    def _retire(self, pooled: PooledContext):
+        pooled.retired = True
+        key = str(pooled.state_path)
+        if self._contexts.get(key) is pooled:
+            del self._contexts[key]
+
+    async def acquire(self, state_path: str | pathlib.Path) -> PooledContext:
+        key = str(state_path)
+        async with self._lock:
+            pooled = self._contexts.get(key)
+            if pooled and (
+                pooled.state_changed()
+                or self.expired(pooled)
+                or not self._browser.is_connected()
+            ):
+                self.logger.info(f"Retire browser context: {pooled}")
+                self._retire(pooled)
+                if pooled.in_use == 0:
+                    await self._close_context(pooled)
+                pooled = None
+            elif pooled is None and self._contexts and not self._in_use:
+                # 该state对应的上下文不存在，清理其他空闲上下文（如切换了state_path）
+                for other in list(self._contexts.values()):
+                    self._retire(other)
+                    await self._close_context(other)
+            if not pooled:
+                pooled = await self._new_context(state_path)
+                self._contexts[key] = pooled
+            pooled.in_use += 1
+            self._in_use += 1
+            return pooled
+
+    async def release(
+        self, pooled: PooledContext, state_auto_save: bool = True, failed=False
+    ):
+        async with self._lock:
+            pooled.in_use -= 1
+            self._in_use -= 1
+            if failed or self.expired(pooled):
+                self._retire(pooled)
+            if state_auto_save:
+                with contextlib.suppress(Exception):
+                    await pooled.context.storage_state(path=pooled.state_path)
+                    # 自己写入的state不应触发重建
+                    pooled.state_version.refresh()
+            if pooled.in_use > 0:
+                return
+            if pooled.retired:
+                await self._close_context(pooled)
+                return
+            # 空闲时关闭所有标签页，只保留上下文
+            for page in pooled.context.pages:
+                with contextlib.suppress(Exception):
+                    await page.close()
+
+    @contextlib.asynccontextmanager
+    async def context(
+        self, state_path: str | pathlib.Path, state_auto_save: bool = True
+    ) -> BrowserContext:
+        pooled = await self.acquire(state_path)
+        failed = False
+        try:
+            yield pooled.context
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            await self.release(pooled, state_auto_save, failed)
+
+    async def close(self):
+        async with self._lock:
+            for pooled in list(self._contexts.values()):
+                await self._close_context(pooled)
+            self._contexts.clear()
+            if self._browser:
+                with contextlib.suppress(Exception):
+                    await self._browser.close()
+                self._browser = None
@@ -0,0 +1,425 @@
+import asyncio
+import hashlib
+import json
+import logging
+import pathlib
+import sqlite3
+from datetime import date, datetime, time
+from functools import lru_cache
+from typing import Any, Iterable
+
+from archive.config import settings
+from archive.core import packs
+from archive.core.search import decode_cursor, encode_cursor, index_text, match_query
+from archive.utils.common import dt_fromisoformat, get_target_url
+
+logger = logging.getLogger("default")
+
+
+def _timestamp(dt: datetime | str | None) -> float | None:
+    return dt_fromisoformat(dt).timestamp() if dt else None
+
+
+def item_row(people: str, item: dict[str, Any]) -> dict[str, Any]:
+    """动态（ActivityItem）对应的目录记录，不含存档信息"""
+    meta = item["meta"]
+    target = item["target"]
+    acted_at = dt_fromisoformat(meta["acted_at"])
+    return {
+        "id": item["id"],
+        "people": people,
+        "action": meta["action"],
+        "target_type": meta["target_type"],
+        "title": target["title"],
+        "url": get_target_url(target["link"]) if target["link"] else None,
+        "author": target["author"],
+        "acted_at": acted_at.timestamp(),
+        "day": acted_at.date().isoformat(),
+        "fetched_at": _timestamp(target.get("fetched_at")),
+    }
+
+
+class Catalog:
+    """
+    存档目录：记录Monitor抓取到的每条动态及Archiver的存档结果，SQLite（WAL）存储
+
+    按用户、日期、动作、目标类型和链接建立索引，查询时不需要遍历结果目录。
+    可以通过`rebuild`从结果目录中的任务文件和info.json重建。
+    开启`search`时标题和正文文本按bigram写入FTS5全文索引。
+    """
+
+    def __init__(self, path: str | pathlib.Path, search: bool = True):
+        self.path = pathlib.Path(path)
+        self.search = search
+        self._conn: sqlite3.Connection | None = None
+        self._lock = asyncio.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "id TEXT PRIMARY KEY, people TEXT NOT NULL, action TEXT, "
+                "target_type TEXT, title TEXT, url TEXT, author TEXT, "
+                "acted_at REAL, day TEXT, fetched_at REAL, "
+                "archive_dir TEXT, files TEXT, archived_at REAL)"
+            )
+            for name, columns in [
+                ("people_acted_at", "people, acted_at"),
+                ("day", "day"),
+                ("action_acted_at", "action, acted_at"),
+                ("target_type_acted_at", "target_type, acted_at"),
+                ("url", "url"),
+                ("archived_at", "archived_at"),
+            ]:
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS items_{name} ON items ({columns})"
+                )
+            # 全文索引的rowid，items的隐式rowid在VACUUM后可能变化
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS items_search ("
+                "docid INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE)"
+            )
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(title, body)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _upsert(self, rows: list[dict[str, Any]], texts: dict[str, str] = None):
+        """插入或更新记录，只更新给出的列。`texts`为记录id对应的正文文本"""
+        conn = self._connect()
+        texts = texts or {}
+        for row in rows:
+            columns = list(row)
+            updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != "id")
+            conn.execute(
+                f"INSERT INTO items ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT (id) DO UPDATE SET {updates}",
+                [row[c] for c in columns],
+            )
+            self._index(conn, row["id"], texts.get(row["id"]))
+        conn.commit()
+
+    def _index(self, conn: sqlite3.Connection, id_: str, text: str | None):
+        """
+        写入全文索引。没有正文时只在首次写入标题，避免覆盖已存档的正文
+        """
+        if not self.search:
+            return
+        created = (
+            conn.execute(
+                "INSERT OR IGNORE INTO items_search (id) VALUES (?)", (id_,)
+            ).rowcount
+            == 1
+        )
+        if not created and text is None:
+            return
+        docid, title = conn.execute(
+            "SELECT s.docid, i.title FROM items_search s JOIN items i ON i.id = s.id "
+            "WHERE s.id = ?",
+            (id_,),
+        ).fetchone()
+        if not created:
+            conn.execute("DELETE FROM items_fts WHERE rowid = ?", (docid,))
+        conn.execute(
+            "INSERT INTO items_fts (rowid, title, body) VALUES (?, ?, ?)",
+            (docid, index_text(title), index_text(text)),
+        )
+
+    def _query(
+        self,
+        people: str = None,
+        action: str = None,
+        target_type: str = None,
+        url: str = None,
+        since: date = None,
+        until: date = None,
+        archived: bool = None,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> tuple[int, list[dict[str, Any]]]:
+        conditions, params = [], []
+        for column, value in [
+            ("people", people),
+            ("action", action),
+            ("target_type", target_type),
+            ("url", url),
+        ]:
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            conditions.append("acted_at >= ?")
+            params.append(datetime.combine(since, time.min).timestamp())
+        if until is not None:
+            conditions.append("acted_at <= ?")
+            params.append(datetime.combine(until, time.max).timestamp())
+        if archived is not None:
+            conditions.append(
+                "archived_at IS NOT NULL" if archived else "archived_at IS NULL"
+            )
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        conn = self._connect()
+        (total,) = conn.execute(
+            f"SELECT COUNT(*) FROM items {where}", params
+        ).fetchone()
+        rows = conn.execute(
+            f"SELECT * FROM items {where} ORDER BY acted_at DESC, id "
+            "LIMIT ? OFFSET ?",
+            [*params, limit, offset],
+        )
+        return total, [self.to_dict(row) for row in rows]
+
+    def _get(self, id_: str) -> dict[str, Any] | None:
+        row = self._connect().execute("SELECT * FROM items WHERE id = ?", (id_,))
+        row = row.fetchone()
+        return self.to_dict(row) if row else None
+
+    def _people(self) -> list[dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT people, COUNT(*) AS items, COUNT(archived_at) AS archived, "
+            "MAX(acted_at) AS latest FROM items GROUP BY people ORDER BY people"
+        )
+        return [self.to_dict(row) for row in rows]
+
+    def _search(
+        self,
+        query: str,
+        people: str = None,
+        action: str = None,
+        target_type: str = None,
+        since: date = None,
+        until: date = None,
+        order: str = "relevance",
+        cursor: str = None,
+        limit: int = 20,
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        match = match_query(query)
+        if match is None:
+            return [], None
+        conditions, params = ["items_fts MATCH ?"], [match]
+        for column, value in [
+            ("people", people),
+            ("action", action),
+            ("target_type", target_type),
+        ]:
+            if value is not None:
+                conditions.append(f"i.{column} = ?")
+                params.append(value)
+        if since is not None:
+            conditions.append("i.acted_at >= ?")
+            params.append(datetime.combine(since, time.min).timestamp())
+        if until is not None:
+            conditions.append("i.acted_at <= ?")
+            params.append(datetime.combine(until, time.max).timestamp())
+        # 相关度按bm25升序（越小越相关，标题权重更高），时间按动态时间降序，相同时按docid
+        if order == "time":
+            sort_key, op, direction = "i.acted_at", "<", "DESC"
+        else:
+            sort_key, op, direction = "bm25(items_fts, 5.0, 1.0)", ">", "ASC"
+        sql = (
+            f"SELECT i.*, s.docid AS docid, {sort_key} AS sort_key "
+            "FROM items_fts JOIN items_search s ON s.docid = items_fts.rowid "
+            f"JOIN items i ON i.id = s.id WHERE {' AND '.join(conditions)}"
+        )
+        cursor_condition = ""
+        if cursor:
+            key, docid = decode_cursor(cursor)
+            cursor_condition = (
+                f"WHERE sort_key {op} ? OR (sort_key = ? AND docid {op} ?)"
+            )
+            params.extend([key, key, docid])
+        rows = (
+            self._connect()
+            .execute(
+                f"SELECT * FROM ({sql}) {cursor_condition} "
+                f"ORDER BY sort_key {direction}, docid {direction} LIMIT ?",
+                [*params, limit + 1],
+            )
+            .fetchall()
+        )
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["sort_key"], rows[-1]["docid"])
+        items = []
+        for row in rows:
+            item = self.to_dict(row)
+            item.pop("docid")
+            item["score"] = -item.pop("sort_key") if order != "time" else None
+            items.append(item)
+        return items, next_cursor
+
+    @staticmethod
+    def to_dict(row: sqlite3.Row) -> dict[str, Any]:
+        d = dict(row)
+        for k in ("acted_at", "fetched_at", "archived_at", "latest"):
+            if d.get(k) is not None:
+                d[k] = datetime.fromtimestamp(d[k])
+        if d.get("files") is not None:
+            d["files"] = json.loads(d["files"])
+        return d
+
+    async def add_items(self, people: str, items: Iterable[dict[str, Any]]):
+        """Monitor抓取到的动态"""
+        rows = [item_row(people, item) for item in items]
+        async with self._lock:
+            await asyncio.to_thread(self._upsert, rows)
+
+    async def add_archive(
+        self,
+        people: str,
+        item: dict[str, Any],
+        archive_dir: str | pathlib.Path,
+        files: list[str],
+        archived_at: datetime,
+        text: str = None,
+    ):
+        """Archiver完成存档的动态，`text`为提取的正文文本"""
+        row = item_row(people, item)
+        row.update(
+            archive_dir=str(archive_dir),
+            files=json.dumps(files, ensure_ascii=False),
+            archived_at=archived_at.timestamp(),
+        )
+        async with self._lock:
+            await asyncio.to_thread(self._upsert, [row], {row["id"]: text or ""})
+
+    async def query(self, **kwargs) -> tuple[int, list[dict[str, Any]]]:
+        """按条件分页查询，按动态时间从新到旧排序，返回(总数, 当前页)"""
+        async with self._lock:
+            return await asyncio.to_thread(self._query, **kwargs)
+
+    async def get(self, id_: str) -> dict[str, Any] | None:
+        async with self._lock:
+            return await asyncio.to_thread(self._get, id_)
+
+    async def people(self) -> list[dict[str, Any]]:
+        """每个用户的动态数、已存档数和最新动态时间"""
+        async with self._lock:
+            return await asyncio.to_thread(self._people)
+
+    async def search_items(
+        self, query: str, **kwargs
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        """全文搜索标题和正文，返回(当前页, 下一页游标)，没有下一页时游标为None"""
+        async with self._lock:
+            return await asyncio.to_thread(self._search, query, **kwargs)
+
+    def rebuild(self, results_dir: str | pathlib.Path) -> int:
+        """
+        清空并从结果目录重建：先读取每个用户tasks目录中的任务文件，再读取archives目录中
+        （包括已打包的）info.json
+
+        早期的info.json没有动态信息，按链接匹配已有记录，匹配不到时根据目录推断
+        """
+        results_dir = pathlib.Path(results_dir)
+        conn = self._connect()
+        for table in ("items", "items_search", "items_fts"):
+            conn.execute(f"DELETE FROM {table}")
+        conn.commit()
+        for people_dir in sorted(p for p in results_dir.iterdir() if p.is_dir()):
+            people = people_dir.name
+            rows = []
+            for task_file in sorted(people_dir.glob("tasks/*.json")):
+                try:
+                    items = json.loads(task_file.read_text(encoding="utf-8"))
+                    rows.extend(item_row(people, item) for item in items)
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.warning(f"Skip {task_file}: {e!r}")
+            self._upsert(rows)
+            for day_dir in self._archive_days(people_dir):
+                names = packs.list_files(results_dir, day_dir)
+                for name in names:
+                    dirname, _, filename = name.partition("/")
+                    if filename != "info.json":
+                        continue
+                    archive_dir = day_dir.joinpath(dirname)
+                    dir_files = [
+                        n.partition("/")[2]
+                        for n in names
+                        if n.startswith(f"{dirname}/") and n != name
+                    ]
+                    try:
+                        self._rebuild_archive(
+                            results_dir, people, archive_dir, dir_files
+                        )
+                    except (ValueError, KeyError, TypeError) as e:
+                        logger.warning(f"Skip {archive_dir}: {e!r}")
+        return conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    @staticmethod
+    def _archive_days(people_dir: pathlib.Path) -> list[pathlib.Path]:
+        """archives中的日期目录，包括已打包的"""
+        days = {p for p in people_dir.glob("archives/*/*/*") if p.is_dir()}
+        days.update(
+            p.with_suffix("")
+            for p in people_dir.glob(f"archives/*/*/*{packs.PACK_SUFFIX}")
+        )
+        return sorted(days)
+
+    def _rebuild_archive(
+        self,
+        results_dir: pathlib.Path,
+        people: str,
+        archive_dir: pathlib.Path,
+        dir_files: list[str],
+    ):
+        def read_text(name: str) -> str | None:
+            relpath = archive_dir.joinpath(name).relative_to(results_dir)
+            data = packs.read_file(results_dir, relpath.as_posix())
+            return data.decode("utf-8") if data is not None else None
+
+        info = json.loads(read_text("info.json") or "")
+        files = info.get("files") or sorted(dir_files)
+        text = None
+        if text_file := next((f for f in files if f.endswith(".txt")), None):
+            text = read_text(text_file)
+        row = {
+            "people": people,
+            "archive_dir": str(archive_dir),
+            "files": json.dumps(files, ensure_ascii=False),
+            "archived_at": _timestamp(info.get("shot_at")),
+        }
+        if item := info.get("item"):
+            row = {**item_row(people, item), **row}
+        else:
+            matched = (
+                self._connect()
+                .execute(
+                    "SELECT id FROM items WHERE people = ? AND url = ? "
+                    "ORDER BY acted_at DESC LIMIT 1",
+                    (people, info["url"]),
+                )
+                .fetchone()
+            )
+            if matched:
+                row["id"] = matched[0]
+            else:
+                y, m, d = archive_dir.parent.relative_to(archive_dir.parents[3]).parts
+                acted_at = datetime(int(y), int(m), int(d))
+                row.update(
+                    id=hashlib.sha1(str(archive_dir).encode("utf-8")).hexdigest(),
+                    action=archive_dir.name.split("-", 1)[0],
+                    title=info["title"],
+                    url=info["url"],
+                    author=info.get("author"),
+                    acted_at=acted_at.timestamp(),
+                    day=acted_at.date().isoformat(),
+                )
+        self._upsert([row], {row["id"]: text or ""})
+
+
+@lru_cache
+def get_catalog() -> Catalog | None:
+    """同一进程共享一个Catalog，未开启时为None"""
+    if not settings.catalog_enabled:
+        return None
+    return Catalog(settings.catalog_path, settings.search_enabled)
@@ -0,0 +1,150 @@
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Callable, TypeAlias
+
+from archive.core.imaging import ScreenshotEncoding
+from archive.core.policy import ResourcePolicy
+from archive.core.snapshot import Artifact, Compression
+from archive.utils.common import dt_fromisoformat, dt_toisoformat
+
+if TYPE_CHECKING:
+    from archive.core.base import BaseWorker
+
+SerializerT: TypeAlias = Callable[[Any], Any]
+
+
+class ConfigError(ValueError):
+    pass
+
+
+class Config:
+    def __init__(
+        self,
+        name: str,
+        serializer: SerializerT = None,
+        deserializer: SerializerT = None,
+        read_only=False,
+        depend_on: str = None,
+        getter: Callable[["BaseWorker", "Config"], Any] = None,
+    ):
+        self.name = name
+        self.serializer = serializer
+        self.deserializer = deserializer
+        self.read_only = read_only
+        self.depend_on = depend_on
+        self._getter = getter or self.default_getter
+        self._updates = []
+
+    @staticmethod
+    def default_getter(worker: "BaseWorker", cfg: "Config"):
+        return getattr(worker, cfg.name, None)
+
+    def getattr(self, worker: "BaseWorker"):
+        return self._getter(worker, self)
+
+    def to_python(self, value):
+        if self.deserializer:
+            return self.deserializer(value)
+        return value
+
+    def to_jsonable(self, value):
+        if self.serializer:
+            return self.serializer(value)
+        return value
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}<{self.name}>"
+
+
+Cfg = Config
+
+
+def strict_bool(value: Any) -> bool:
+    if not isinstance(value, bool):
+        raise ValueError(f"{value!r} is not a boolean")
+    return value
+
+
+def artifact_list(value: list[str]) -> list[str]:
+    return [Artifact(a).value for a in value]
+
+
+class FetchMode(str, Enum):
+    DOM = "dom"  # 解析渲染后的动态页
+    API = "api"  # 解析动态接口返回的JSON
+
+
+class TaskGranularity(str, Enum):
+    FILE = "file"  # 每次抓取的所有动态作为一个任务，任务值为JSON文件路径
+    ITEM = "item"  # 每条动态作为一个任务，直接携带在任务值中
+
+
+class ScreenshotMode(str, Enum):
+    FULL = "full"  # 一次截取整个页面
+    TILED = "tiled"  # 按段截取，内存占用不随页面高度增长
+    AUTO = "auto"  # 页面高度超过screenshot_tile_threshold时分段截取
+
+
+# 各Worker的配置项，不依赖Playwright，控制端通过它们校验修改的配置
+BASE_CONFIGURABLE: list[Cfg] = [
+    Cfg("people"),
+    Cfg("page_default_timeout", deserializer=int),
+    Cfg("interval", deserializer=int),
+    Cfg("person_page_url", read_only=True, depend_on="people"),
+    Cfg("results_dir", str, read_only=True, depend_on="people"),
+    Cfg("tasks_dir", str, read_only=True, depend_on="people"),
+    Cfg("resource_policy", ResourcePolicy.to_dict, ResourcePolicy.from_dict),
+    Cfg(
+        "screenshot_encoding",
+        ScreenshotEncoding.to_dict,
+        ScreenshotEncoding.from_dict,
+    ),
+]
+
+MONITOR_CONFIGURABLE: list[Cfg] = BASE_CONFIGURABLE + [
+    Cfg("fetch_until", dt_toisoformat, dt_fromisoformat),
+    Cfg("latest_dt", dt_toisoformat, dt_fromisoformat, read_only=True),
+    Cfg("batch_extract", deserializer=strict_bool),
+    Cfg("fetch_mode", deserializer=FetchMode),
+    Cfg("activity_screenshot", deserializer=strict_bool),
+    Cfg("fast_poll", deserializer=strict_bool),
+    Cfg("task_granularity", deserializer=TaskGranularity),
+    Cfg("save_task_file", deserializer=strict_bool),
+    Cfg("next_due_at", lambda dt: dt and dt_toisoformat(dt), read_only=True),
+]
+
+ARCHIVER_CONFIGURABLE: list[Cfg] = BASE_CONFIGURABLE + [
+    Cfg("screenshot_max_page_scroll_height", deserializer=int),
+    Cfg("screenshot_mode", deserializer=ScreenshotMode),
+    Cfg("screenshot_tile_height", deserializer=int),
+    Cfg("screenshot_tile_threshold", deserializer=int),
+    Cfg("artifacts", deserializer=artifact_list),
+    Cfg("compression", deserializer=Compression.parse),
+    Cfg("concurrency", deserializer=int),
+    Cfg("rate_limit", deserializer=float),
+]
+
+WORKER_CONFIGURABLE: dict[str, list[Cfg]] = {
+    "monitor": MONITOR_CONFIGURABLE,
+    "archiver": ARCHIVER_CONFIGURABLE,
+}
+
+
+def parse_config(cfg: Cfg, value: Any) -> Any:
+    """按配置项反序列化，值无效时抛出ConfigError"""
+    try:
+        return cfg.to_python(value)
+    except (ValueError, TypeError, AttributeError) as e:
+        raise ConfigError(f"Invalid value for {cfg.name}: {value!r} ({e})") from e
+
+
+def validate_configs(
+    configurable: list[Cfg], configs: dict[str, Any]
+) -> dict[str, Any]:
+    """校验可修改的配置，返回规范化后可写入Redis的值，忽略只读和未知的配置项"""
+    validated = {}
+    for cfg in configurable:
+        if cfg.read_only or cfg.name not in configs:
+            continue
+        value = parse_config(cfg, configs[cfg.name])
+        validated[cfg.name] = cfg.to_jsonable(value)
+    return validated
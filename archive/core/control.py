@@ -0,0 +1,184 @@
+import json
+import pathlib
+from enum import Enum
+from typing import Any
+
+from redis import asyncio as aioredis
+
+from archive.config import default, settings
+from archive.core.configs import WORKER_CONFIGURABLE, validate_configs
+from archive.core.queue import TaskQueue
+from archive.utils.encoder import JSONEncoder
+
+
+def get_redis(redis_url: str = settings.redis_url) -> aioredis.Redis:
+    return aioredis.from_url(
+        redis_url,
+        password=settings.redis_passwd,
+        encoding="utf-8",
+        decode_responses=True,
+    )
+
+
+class ConfigFilter(str, Enum):
+    ALL = "all"
+    READ_ONLY = "read_only"
+    WRITABLE = "writable"
+
+
+class WorkStatus(str, Enum):
+    RUNNING = "running"  # 正在运行
+    WAITING = "waiting"  # 正在等待下次运行
+
+
+class WorkerEvent(str, Enum):
+    PAUSE = "pause"
+    RESUME = "resume"
+    CONFIGS = "configs"  # 配置被修改
+
+
+class WorkerControl:
+    """
+    Worker的控制端：只读写Worker在Redis中的状态、暂停、配置和任务队列
+
+    不创建浏览器等资源，API等进程可以通过它控制Worker，并共享同一个Redis连接池。
+    `BaseWorker`继承它，两者使用相同的Redis键。
+    """
+
+    name = ""
+    redis_key_prefix = "zhi_archive:archive"
+    state_path_key = f"{redis_key_prefix}:state_path"
+    tasks_key = f"{redis_key_prefix}:tasks"  # list
+    tasks_result_key = f"{redis_key_prefix}:task_results"  # hash
+
+    def __init__(
+        self,
+        name: str = None,
+        scope: str = None,
+        redis: aioredis.Redis = None,
+        redis_url: str = settings.redis_url,
+    ):
+        if name:
+            self.name = name
+        # 按用户区分Redis键（状态、暂停、配置），用于在一个进程中监测多个用户
+        self.scope = scope
+        self.redis = redis or get_redis(redis_url)
+        self.task_queues = [
+            TaskQueue(self.redis, self.get_tasks_key(shard))
+            for shard in range(max(1, settings.archive_shards))
+        ]
+
+    @classmethod
+    def get_tasks_key(cls, shard: int = 0) -> str:
+        # 分片0沿用原来的键，未分片时与之前的队列兼容
+        return cls.tasks_key if shard == 0 else f"{cls.tasks_key}:{shard}"
+
+    @property
+    def worker_key_prefix(self):
+        if self.scope:
+            return f"{self.redis_key_prefix}:{self.name}:{self.scope}"
+        return f"{self.redis_key_prefix}:{self.name}"
+
+    @property
+    def status_key(self):
+        return f"{self.worker_key_prefix}:status"
+
+    @property
+    def people_key(self):
+        return (
+            f"{self.redis_key_prefix}:{self.name}:people"  # set，多用户监测中的所有用户
+        )
+
+    @property
+    def members_key(self):
+        return f"{self.worker_key_prefix}:members"  # sorted set，Archiver集群成员
+
+    async def get_status(self) -> WorkStatus:
+        return WorkStatus(await self.redis.get(self.status_key) or WorkStatus.WAITING)
+
+    async def set_status(self, status: WorkStatus):
+        return await self.redis.set(self.status_key, status.value)
+
+    async def get_state_path_from_redis(self) -> pathlib.Path | None:
+        path = await self.redis.get(self.state_path_key)
+        return pathlib.Path(path) if path else None
+
+    async def set_state_path_to_redis(self, path: str | pathlib.Path):
+        await self.redis.set(self.state_path_key, str(path))
+
+    async def get_state_path(self) -> pathlib.Path | str:
+        return await self.get_state_path_from_redis() or settings.states_dir.joinpath(
+            default.state_file
+        )
+
+    @property
+    def configs_key(self):
+        return f"{self.worker_key_prefix}:configs"
+
+    @property
+    def configs_version_key(self):
+        return f"{self.configs_key}:version"
+
+    @property
+    def configs_schema_key(self):
+        # 配置项 -> 是否只读，由Worker写入
+        return f"{self.configs_key}:schema"
+
+    async def get_configs_and_schema(self) -> tuple[dict[str, Any], dict[str, bool]]:
+        configs_str, schema_str = await self.redis.mget(
+            self.configs_key, self.configs_schema_key
+        )
+        return json.loads(configs_str or "{}"), json.loads(schema_str or "{}")
+
+    async def get_configs(
+        self, filter_: ConfigFilter = ConfigFilter.ALL
+    ) -> dict[str, Any]:
+        """Worker最近写入Redis的配置，Worker未运行过时为空"""
+        configs, schema = await self.get_configs_and_schema()
+        if filter_ == ConfigFilter.ALL:
+            return configs
+        read_only = filter_ == ConfigFilter.READ_ONLY
+        return {k: v for k, v in configs.items() if schema.get(k) is read_only}
+
+    async def write_writeable_configs(self, configs: dict[str, Any]):
+        """
+        写入可修改的配置并通知Worker重新加载，只读配置由Worker加载后更新
+
+        写入前按配置项反序列化校验，有无效的值时抛出ConfigError，不写入任何配置
+        """
+        all_, schema = await self.get_configs_and_schema()
+        configs = {k: v for k, v in configs.items() if schema.get(k) is False}
+        if configurable := WORKER_CONFIGURABLE.get(self.name):
+            configs = validate_configs(configurable, configs)
+        all_.update(configs)
+        # 配置和版本号在同一事务中修改，Worker写回配置前据此判断是否需要重新加载
+        async with self.redis.pipeline() as pipe:
+            pipe.set(self.configs_key, json.dumps(all_, cls=JSONEncoder))
+            pipe.incr(self.configs_version_key)
+            result, _ = await pipe.execute()
+        await self.publish(WorkerEvent.CONFIGS)
+        return result
+
+    @property
+    def pause_key(self):
+        return f"{self.worker_key_prefix}:pause"
+
+    @property
+    def events_channel(self):
+        return f"{self.worker_key_prefix}:events"
+
+    async def publish(self, event: WorkerEvent):
+        return await self.redis.publish(self.events_channel, event.value)
+
+    async def pause(self):
+        result = await self.redis.set(self.pause_key, 1)
+        await self.publish(WorkerEvent.PAUSE)
+        return result
+
+    async def resume(self):
+        result = await self.redis.set(self.pause_key, 0)
+        await self.publish(WorkerEvent.RESUME)
+        return result
+
+    async def need_pause(self) -> bool:
+        return int(await self.redis.get(self.pause_key) or 1) == 1
@@ -0,0 +1,85 @@
+from datetime import datetime
+from typing import Any
+from urllib import parse
+
+from archive.config import settings
+from archive.core.base import ActivityItem, get_correct_target_type
+from archive.utils.common import uuid_hex
+
+
+def get_activities_api_url(people: str) -> str:
+    return settings.activity_api_url.format(people=people)
+
+
+def get_activities_first_page_url(people: str, limit: int = 20) -> str:
+    query = parse.urlencode({"limit": limit, "desktop": "true"})
+    return f"{get_activities_api_url(people)}?{query}"
+
+
+def activity_acted_at(data: dict[str, Any]) -> datetime:
+    return datetime.fromtimestamp(data["created_time"])
+
+
+def is_sticky(data: dict[str, Any]) -> bool:
+    return bool(data.get("is_sticky") or data.get("is_top"))
+
+
+def get_target_link(target: dict[str, Any]) -> str:
+    """
+    与动态页中的链接格式保持一致，如：//www.zhihu.com/question/1/answer/2
+    """
+    target_type = target.get("type")
+    if target_type == "answer":
+        question_id = (target.get("question") or {}).get("id")
+        return f"//www.zhihu.com/question/{question_id}/answer/{target['id']}"
+    elif target_type == "article":
+        return f"//zhuanlan.zhihu.com/p/{target['id']}"
+    elif target_type == "pin":
+        return f"//www.zhihu.com/pin/{target['id']}"
+    return ""
+
+
+def get_target_title(target: dict[str, Any]) -> str:
+    if title := target.get("title"):
+        return title
+    if question := target.get("question"):
+        return question.get("title", "")
+    return target.get("excerpt_title", "")
+
+
+def parse_activity(data: dict[str, Any]) -> ActivityItem | None:
+    """
+    将动态接口返回的一条数据转换为`ActivityItem`，不关心的类型返回None
+    """
+    action_texts = data.get("action_text", "")
+    if "了" not in action_texts:
+        return
+    action_text, target_type_text = action_texts.split("了", maxsplit=1)
+    target_type = get_correct_target_type(action_text, target_type_text)
+    if target_type is None:
+        return
+    target = data.get("target") or {}
+    acted_at = activity_acted_at(data)
+    now = datetime.now()
+    return {
+        "id": uuid_hex(),
+        "meta": {
+            "action": action_text,
+            "target_type": target_type.value,
+            "acted_at": acted_at,
+            "raw": [action_texts, acted_at.strftime("%Y-%m-%d %H:%M")],
+        },
+        "target": {
+            "title": get_target_title(target),
+            "link": get_target_link(target),
+            "author": (target.get("author") or {}).get("url_token", ""),
+            "fetched_at": now,
+        },
+    }
+
+
+def get_next_page_url(payload: dict[str, Any]) -> str | None:
+    paging = payload.get("paging") or {}
+    if paging.get("is_end") or not paging.get("next"):
+        return
+    return paging["next"]
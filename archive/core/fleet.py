@@ -0,0 +1,101 @@
+import asyncio
+import contextlib
+import logging
+import os
+import socket
+import time
+import zlib
+
+from redis import asyncio as aioredis
+
+from archive.config import settings
+
+
+def get_shard(people: str | None, shards: int = None) -> int:
+    """按用户分片，同一用户的任务总是进入同一个队列"""
+    shards = shards or settings.archive_shards
+    if shards <= 1 or not people:
+        return 0
+    return zlib.crc32(people.encode("utf-8")) % shards
+
+
+class ArchiverFleet:
+    """
+    Archiver集群成员管理
+
+    每个Archiver定时在`key`（sorted set，score为心跳时间）中登记，超过`member_ttl`秒未心跳视为离开。
+    成员按ID排序后，第i个成员负责所有`shard % 成员数 == i`的分片，成员加入或离开时自动重新分配。
+    只有一个分片时所有成员共同消费该分片（与未分片时一致）。
+    """
+
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        key: str,
+        shards: int = settings.archive_shards,
+        heartbeat_interval: int = settings.archiver_heartbeat_interval,
+        logger: logging.Logger = None,
+    ):
+        self.redis = redis
+        self.key = key
+        self.shards = max(1, shards)
+        self.heartbeat_interval = heartbeat_interval
+        self.member_ttl = heartbeat_interval * 3
+        self.member_id = f"{socket.gethostname()}:{os.getpid()}:{os.urandom(3).hex()}"
+        self.logger = logger or logging.getLogger("archiver")
+        self._assigned: list[int] | None = None
+
+    async def heartbeat(self):
+        now = time.time()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(self.key, {self.member_id: now})
+            pipe.zremrangebyscore(self.key, "-inf", now - self.member_ttl)
+            await pipe.execute()
+
+    async def members(self) -> list[str]:
+        return sorted(
+            await self.redis.zrangebyscore(
+                self.key, time.time() - self.member_ttl, "+inf"
+            )
+        )
+
+    async def assigned_shards(self) -> list[int]:
+        if self.shards == 1:
+            return [0]
+        members = await self.members()
+        if self.member_id not in members:
+            await self.heartbeat()
+            members = await self.members()
+        index = members.index(self.member_id)
+        assigned = [s for s in range(self.shards) if s % len(members) == index]
+        if assigned != self._assigned:
+            self.logger.info(
+                f"Shards rebalanced, {len(members)} archivers, "
+                f"{self.member_id} owns shards: {assigned}"
+            )
+            self._assigned = assigned
+        return assigned
+
+    async def leave(self):
+        await self.redis.zrem(self.key, self.member_id)
+
+    @contextlib.asynccontextmanager
+    async def join(self):
+        """加入集群并在后台保持心跳，退出时离开"""
+
+        async def keep_alive():
+            while True:
+                try:
+                    await self.heartbeat()
+                except Exception as e:
+                    self.logger.exception(e)
+                await asyncio.sleep(self.heartbeat_interval)
+
+        await self.heartbeat()
+        task = asyncio.create_task(keep_alive())
+        try:
+            yield self
+        finally:
+            task.cancel()
+            with contextlib.suppress(Exception):
+                await self.leave()
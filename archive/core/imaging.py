@@ -0,0 +1,179 @@
+import asyncio
+import functools
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+from typing import Any
+
+from archive.config import settings
+
+# WebP支持的最大边长，超出时改用JPEG
+WEBP_MAX_SIZE = 16383
+
+
+class ImageFormat(str, Enum):
+    PNG = "png"
+    JPEG = "jpeg"
+    WEBP = "webp"
+
+    @property
+    def suffix(self) -> str:
+        return ".jpg" if self == ImageFormat.JPEG else f".{self.value}"
+
+
+class ScreenshotEncoding:
+    """
+    截图编码
+
+    PNG和JPEG且不缩放时由Playwright直接输出，否则先截取PNG，再在进程池中用Pillow重新编码
+    """
+
+    def __init__(
+        self,
+        format: ImageFormat | str = ImageFormat.PNG,
+        quality: int = 80,
+        scale: float = 1.0,
+        max_width: int = 0,
+    ):
+        self.format = ImageFormat(format)
+        self.quality = int(quality)  # 1-100，PNG无效
+        self.scale = float(scale)  # 输出图片相对于页面（CSS像素）的缩放比例
+        self.max_width = int(max_width)  # 像素，超出时等比缩小，0表示不限制
+        if not 1 <= self.quality <= 100:
+            raise ValueError(f"quality must be between 1 and 100: {quality!r}")
+        if self.scale <= 0:
+            raise ValueError(f"scale must be positive: {scale!r}")
+        if self.max_width < 0:
+            raise ValueError(f"max_width must not be negative: {max_width!r}")
+
+    @property
+    def suffix(self) -> str:
+        return self.format.suffix
+
+    @property
+    def native(self) -> bool:
+        return (
+            self.format in (ImageFormat.PNG, ImageFormat.JPEG)
+            and self.scale == 1
+            and not self.max_width
+        )
+
+    def screenshot_options(self) -> dict[str, Any]:
+        """Playwright截图参数"""
+        if not self.native:
+            return {"type": "png", "scale": "css"}
+        options = {"type": self.format.value, "scale": "css"}
+        if self.format == ImageFormat.JPEG:
+            options["quality"] = self.quality
+        return options
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "format": self.format.value,
+            "quality": self.quality,
+            "scale": self.scale,
+            "max_width": self.max_width,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ScreenshotEncoding":
+        return cls(**data)
+
+    @classmethod
+    def from_settings(cls) -> "ScreenshotEncoding":
+        return cls(
+            settings.screenshot_format,
+            settings.screenshot_quality,
+            settings.screenshot_scale,
+            settings.screenshot_max_width,
+        )
+
+
+def encode_image(
+    data: bytes,
+    format: str,
+    quality: int = 80,
+    scale: float = 1.0,
+    max_width: int = 0,
+) -> tuple[bytes, str]:
+    """在子进程中执行：缩放并编码图片，返回编码后的数据和实际使用的格式"""
+    from PIL import Image
+
+    image_format = ImageFormat(format)
+    with Image.open(io.BytesIO(data)) as image:
+        width, height = image.size
+        ratio = scale
+        if max_width and width * ratio > max_width:
+            ratio = max_width / width
+        if ratio != 1:
+            image = image.resize(
+                (max(1, round(width * ratio)), max(1, round(height * ratio))),
+                Image.LANCZOS,
+            )
+        if image_format == ImageFormat.WEBP and max(image.size) > WEBP_MAX_SIZE:
+            image_format = ImageFormat.JPEG
+        if image_format == ImageFormat.PNG:
+            options = {"optimize": True}
+        elif image_format == ImageFormat.JPEG:
+            image = image.convert("RGB")
+            options = {"quality": quality, "optimize": True, "progressive": True}
+        else:
+            options = {"quality": quality, "method": 4}
+        output = io.BytesIO()
+        image.save(output, format=image_format.value.upper(), **options)
+    return output.getvalue(), image_format.value
+
+
+def difference_hash(data: bytes, size: int = 8) -> tuple[int, int, int]:
+    """在子进程中执行：图片的差异哈希（dHash，size*size位）及图片的宽高"""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        width, height = image.size
+        pixels = list(
+            image.convert("L").resize((size + 1, size), Image.LANCZOS).getdata()
+        )
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value, width, height
+
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # Worker进程中有Playwright的线程，使用spawn避免fork
+        _executor = ProcessPoolExecutor(
+            max_workers=max(1, settings.screenshot_encode_workers),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+async def run_in_executor(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args))
+
+
+async def encode(data: bytes, encoding: ScreenshotEncoding) -> tuple[bytes, str]:
+    """按`encoding`重新编码，返回编码后的数据和文件后缀"""
+    data, format = await run_in_executor(
+        encode_image,
+        data,
+        encoding.format.value,
+        encoding.quality,
+        encoding.scale,
+        encoding.max_width,
+    )
+    return data, ImageFormat(format).suffix
+
+
+async def image_hash(data: bytes) -> tuple[int, int, int]:
+    return await run_in_executor(difference_hash, data)
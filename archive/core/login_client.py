@@ -0,0 +1,96 @@
+import pathlib
+from enum import Enum
+
+from redis import asyncio as aioredis
+
+from archive.config import settings
+
+
+class QRCodeTaskStatus(str, Enum):
+    PENDING = "pending"
+    FAILED = "failed"
+    OK = "ok"
+    NO_EXIST = "not_exist"
+    WAITING_FOR_SCAN = "waiting_for_scan"
+
+
+class QRCodeTask:
+    def __init__(self, qrcode_path, state_path):
+        self.qrcode_path = pathlib.Path(qrcode_path).resolve()
+        self.state_path = pathlib.Path(state_path).resolve()
+
+    @property
+    def task_name(self) -> str:
+        return str(self.qrcode_path)
+
+    def as_value(self) -> str:
+        return f"{self.qrcode_path}:{self.state_path}"
+
+    @classmethod
+    def from_value(cls, v: str) -> "QRCodeTask":
+        qrcode_path, state_path = v.rsplit(":", maxsplit=1)
+        return cls(qrcode_path, state_path)
+
+    def __str__(self):
+        return f"{self.__class__.__name__}<{self.as_value()}>"
+
+    __repr__ = __str__
+
+
+class Base:
+    redis_key_prefix = "zhi_archive:login"
+    qrcode_task_key = f"{redis_key_prefix}:qrcode_task"
+    qrcode_task_result_key = f"{redis_key_prefix}:qrcode_task_result"
+    task_timeout = 60 * 5
+
+    def __init__(
+        self, redis_url: str = settings.redis_url, redis: aioredis.Redis = None
+    ):
+        self.redis = redis or aioredis.from_url(
+            redis_url,
+            password=settings.redis_passwd,
+            encoding="utf-8",
+            decode_responses=True,
+        )
+
+    async def new_task(self, task: QRCodeTask) -> QRCodeTask:
+        """
+        新任务
+
+        确保当前没有正在进行的任务，否则返回当前任务
+        """
+        exist = await self.get_qrcode_task()
+        if exist:
+            task_status = await self.get_qrcode_task_status(exist.task_name)
+            if task_status in [
+                QRCodeTaskStatus.PENDING,
+                QRCodeTaskStatus.WAITING_FOR_SCAN,
+            ]:
+                return exist
+        await self.redis.set(
+            self.qrcode_task_key, task.as_value(), ex=self.task_timeout
+        )
+        return task
+
+    async def get_qrcode_task(self) -> QRCodeTask | None:
+        task = await self.redis.get(self.qrcode_task_key)
+        if not task:
+            return
+        return QRCodeTask.from_value(task)
+
+    async def get_qrcode_task_status(self, task_name: str) -> QRCodeTaskStatus:
+        status = await self.redis.hget(self.qrcode_task_result_key, task_name)
+        try:
+            return QRCodeTaskStatus(status)
+        except ValueError:
+            return QRCodeTaskStatus.NO_EXIST
+
+    async def set_qrcode_task_status(self, task_name: str, status: QRCodeTaskStatus):
+        result = await self.redis.hset(
+            self.qrcode_task_result_key, task_name, status.value
+        )
+        return result
+
+
+class ZhiLoginClient(Base):
+    pass
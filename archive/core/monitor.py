@@ -1,36 +1,57 @@
 import asyncio
 import json
+import logging
 import pathlib
+import time
 from datetime import datetime, timedelta
+from typing import Any
 
-from playwright.async_api import Locator, Page, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import (
+    APIRequestContext,
+    Locator,
+    Page,
+    Response,
+    TimeoutError as PlaywrightTimeoutError,
+    async_playwright,
+)
 
 from archive.config import default, settings
 from archive.core.base import (
+    AbnormalError,
     ActivityItem,
     ArchiveTask,
     BaseWorker,
-    Cfg,
     Target,
     get_correct_target_type,
 )
+from archive.core.browser import BrowserPool
+from archive.core.catalog import get_catalog
+from archive.core.configs import MONITOR_CONFIGURABLE, FetchMode, TaskGranularity
+from archive.core.feed import (
+    activity_acted_at,
+    get_activities_api_url,
+    get_activities_first_page_url,
+    get_next_page_url,
+    is_sticky,
+    parse_activity,
+)
+from archive.core.poller import ActivityPoller
+from archive.core.scheduler import AdaptiveScheduler
+from archive.core.seen import activity_fingerprint, get_seen_index
 from archive.utils.common import (
     dt_fromisoformat,
     dt_str,
-    dt_toisoformat,
     get_validate_filename,
     uuid_hex,
 )
 from archive.utils.encoder import JSONEncoder
+from archive.utils.js import extract_activity_items_js
 
 
 class Monitor(BaseWorker):
     name = "monitor"
     output_name = "activities"
-    configurable = BaseWorker.configurable + [
-        Cfg("fetch_until", dt_toisoformat, dt_fromisoformat),
-        Cfg("latest_dt", dt_toisoformat, dt_fromisoformat, read_only=True),
-    ]
+    configurable = MONITOR_CONFIGURABLE
 
     def __init__(
         self,
@@ -40,15 +61,89 @@ class Monitor(BaseWorker):
         - timedelta(days=settings.monitor_fetch_until),
         page_default_timeout=30 * 1000,
         interval=60 * 5,
+        **kwargs,
     ):
         super().__init__(
             people,
             init_state_path,
             page_default_timeout,
             interval=interval,
+            **kwargs,
         )
         self.fetch_until = fetch_until
         self.latest_dt = datetime.now()
+        self.batch_extract = settings.monitor_batch_extract
+        self.fetch_mode = FetchMode(settings.monitor_fetch_mode)
+        self.activity_screenshot = settings.monitor_activity_screenshot
+        self.fast_poll = settings.monitor_fast_poll
+        self.task_granularity = TaskGranularity(settings.monitor_task_granularity)
+        self.save_task_file = settings.monitor_save_task_file
+        self.poller = ActivityPoller(self)
+        self.seen_index = get_seen_index(
+            settings.seen_index_backend,
+            self.redis,
+            settings.seen_index_path,
+            settings.seen_index_retention_days,
+        )
+        self._seen: set[str] = set()
+        self.scheduler = (
+            AdaptiveScheduler() if settings.monitor_adaptive_interval else None
+        )
+        self.next_due_at: datetime | None = None
+
+    def reached_until(self, acted_at: datetime, until: datetime) -> bool:
+        if self.seen_index is None:
+            return acted_at <= until
+        # 有已抓取索引时多抓取一段时间，由索引去重
+        return acted_at < until - timedelta(seconds=settings.monitor_fetch_overlap)
+
+    async def load_seen(self, until: datetime):
+        if self.seen_index is None:
+            return
+        since = until - timedelta(seconds=settings.monitor_fetch_overlap)
+        self._seen = await self.seen_index.recent(self.people, since)
+
+    async def observe_activities(self, items: list["ActivityItem"]):
+        if self.scheduler is None:
+            return
+        if not self.scheduler.known(self.people) and self.seen_index:
+            # 首次运行时从已抓取索引中获取历史动态时间
+            since = datetime.now() - timedelta(seconds=self.scheduler.lookback)
+            self.scheduler.observe(
+                self.people, await self.seen_index.acted_ats(self.people, since)
+            )
+        self.scheduler.observe(
+            self.people, [dt_fromisoformat(item["meta"]["acted_at"]) for item in items]
+        )
+
+    async def cleanup(self):
+        await self.poller.close()
+
+    async def after_run(self):
+        if self.scheduler:
+            self.next_due_at = self.scheduler.schedule(self.people)
+            self.logger.info(
+                f"动态频率：{self.scheduler.activity_rate(self.people):.2f}次/小时，"
+                f"下次检查时间：{self.next_due_at}"
+            )
+        await super().after_run()
+
+    async def wait_next(self, timeout: float = None):
+        if self.scheduler is None or self.next_due_at is None:
+            return await super().wait_next(timeout)
+        delay = (self.next_due_at - datetime.now()).total_seconds()
+        await super().wait_next(max(0.0, delay))
+        await self.scheduler.acquire()
+
+    def is_seen(self, item: "ActivityItem") -> bool:
+        return activity_fingerprint(item) in self._seen
+
+    async def mark_seen(self, items: list["ActivityItem"]):
+        if self.seen_index is None:
+            return
+        await self.seen_index.add(self.people, items)
+        await self.seen_index.prune(self.people)
+        self._seen.update(activity_fingerprint(item) for item in items)
 
     async def extract_one(
         self,
@@ -70,6 +165,35 @@ class Monitor(BaseWorker):
         author = author.rsplit("/", maxsplit=1)[-1]
         return {"title": title, "link": link, "author": author, "fetched_at": now}
 
+    @staticmethod
+    def target_from_extracted(extracted: dict) -> Target:
+        now = datetime.now()
+        title, link, author = extracted["title"], extracted["link"], extracted["author"]
+        if title is None or link is None or author is None:
+            return {"title": "", "link": "", "author": "", "fetched_at": now}
+        author = author.rsplit("/", maxsplit=1)[-1]
+        return {"title": title, "link": link, "author": author, "fetched_at": now}
+
+    async def extract_all(self, page: Page, start: int = 0) -> list[dict]:
+        """
+        通过一次`page.evaluate`提取从`start`开始所有动态的meta文本、置顶标记和目标信息
+        """
+        return await page.evaluate(
+            extract_activity_items_js, [settings.activity_item_selector, start]
+        )
+
+    async def extract_meta(self, item_locator: "Locator") -> tuple[list[str], bool]:
+        meta_locator = item_locator.locator("div.ActivityItem-meta")
+        meta_texts = await meta_locator.locator("span").all_text_contents()
+        if len(meta_texts) < 2:
+            return meta_texts, False
+        sticky = bool(
+            await item_locator.locator("div.ContentItem span.ActivityItem-StickyMark")
+            .get_by_text("置顶")
+            .count()
+        )
+        return meta_texts, sticky
+
     async def fetch_once(
         self, until: datetime, page: Page, start: int = 0, acted_at=None
     ) -> tuple[list["ActivityItem"], int, datetime]:
@@ -83,22 +207,24 @@ class Monitor(BaseWorker):
         )
         acted_at = acted_at or datetime.now()
         latest_one_index = 0
+        extracted_list = (
+            await self.extract_all(page, start) if self.batch_extract else []
+        )
         for i in range(start, total):
             self.logger.info(f"动态序号: {i}")
             item_locator = items_locator.nth(i)
-            meta_locator = item_locator.locator("div.ActivityItem-meta")
-            meta_texts = await meta_locator.locator("span").all_text_contents()
+            extracted = (
+                extracted_list[i - start] if i - start < len(extracted_list) else None
+            )
+            if extracted:
+                meta_texts, sticky = extracted["metaTexts"], extracted["sticky"]
+            else:
+                meta_texts, sticky = await self.extract_meta(item_locator)
             if len(meta_texts) < 2:
                 continue
             count += 1
             # 忽略置顶
-            if (
-                await item_locator.locator(
-                    "div.ContentItem span.ActivityItem-StickyMark"
-                )
-                .get_by_text("置顶")
-                .count()
-            ):
+            if sticky:
                 latest_one_index += 1
                 self.logger.warning(f"忽略置顶项：{meta_texts}")
                 continue
@@ -109,7 +235,8 @@ class Monitor(BaseWorker):
                 self.logger.info(f"最新动态时间：{acted_at}")
                 self.latest_dt = acted_at
             # 动态时间（e.g. 2023-12-25 16:58)只精确到秒，如果停止时间的那秒有多条动态，则会遗漏
-            if acted_at <= until:
+            # 启用已抓取索引时会多抓取一段时间并去重，避免遗漏
+            if self.reached_until(acted_at, until):
                 self.logger.info(f"当前动态时间：{acted_at} 早于停止时间：{until}, 将停止本次抓取")
                 break
             action_text, target_type_text = action_texts.split("了")
@@ -117,7 +244,10 @@ class Monitor(BaseWorker):
             if target_type is None:
                 self.logger.warning(f"忽略该类型: {action_texts}")
                 continue
-            target = await self.extract_one(item_locator)
+            if extracted:
+                target = self.target_from_extracted(extracted)
+            else:
+                target = await self.extract_one(item_locator)
             self.logger.info(f"于{acted_at_text} {action_texts}\n\t{target['title']}")
             item = {
                 "id": uuid_hex(),
@@ -129,12 +259,18 @@ class Monitor(BaseWorker):
                 },
                 "target": target,
             }
+            if self.is_seen(item):
+                self.logger.info(f"已抓取过该动态，跳过：{target['title']}")
+                continue
             items.append(item)
-            item_filename = get_validate_filename(
-                f"{item['meta']['action']}-{item['target']['title']}-{item['id'][:8]}.png"
+            if not self.activity_screenshot:
+                continue
+            item_name = get_validate_filename(
+                f"{item['meta']['action']}-{item['target']['title']}-{item['id'][:8]}"
+            )
+            await self.save_screenshot(
+                item_locator, self.get_date_dir(acted_at.date()), item_name
             )
-            target_path = self.get_date_dir(acted_at.date()).joinpath(item_filename)
-            await item_locator.screenshot(path=target_path, type="png")
 
         return items, count, acted_at
 
@@ -144,14 +280,14 @@ class Monitor(BaseWorker):
         items = []
         i = 1
         self.logger.info("按动态页从上至下（从新向旧）抓取...")
-        while cur_acted_at > until:
+        while not self.reached_until(cur_acted_at, until):
             self.logger.info(f"第{i}次抓取")
             _items, count, cur_acted_at = await self.fetch_once(
                 until, page, start, cur_acted_at
             )
             start += count
             items.extend(_items)
-            if cur_acted_at <= until:
+            if self.reached_until(cur_acted_at, until):
                 self.logger.info(f"本次抓取最早动态时间：{cur_acted_at} 早于停止时间：{until}, 将停止")
                 break
             self.logger.info("Press End.")
@@ -166,34 +302,130 @@ class Monitor(BaseWorker):
             except PlaywrightTimeoutError as e:
                 self.logger.info("Done, due to timeout")
                 self.logger.exception(e)
-                await page.screenshot(
-                    path=self.results_dir.joinpath(
+                await self.write_bytes(
+                    self.results_dir.joinpath(
                         f"error_{cur_acted_at.strftime('%Y%m%d%H%M%S')}.png"
                     ),
-                    type="png",
-                    full_page=True,
+                    await page.screenshot(type="png", full_page=True),
                 )
                 break
             i += 1
-            await asyncio.sleep(1)
+            # 新的一批动态渲染完成后再提取
+            await self.readiness.dom_settled(page)
         self.fetch_until = self.latest_dt
         return items
 
+    async def get_json(self, request: APIRequestContext, url: str) -> dict[str, Any]:
+        self.logger.info(f"Request: {url}")
+        response = await request.get(url)
+        if await self.is_abnormal(response) or response.status in (401, 403):
+            raise AbnormalError(f"{url}: {response.status}\n{await response.text()}")
+        return await response.json()
+
+    async def fetch_from_api(self, until: datetime, page: Page) -> list["ActivityItem"]:
+        """
+        打开动态页时监听动态接口的响应，之后通过接口返回的游标翻页
+        """
+        api_url = get_activities_api_url(self.people)
+        captured: list[Response] = []
+
+        def on_response(response: Response):
+            if response.url.startswith(api_url):
+                captured.append(response)
+
+        page.on("response", on_response)
+        try:
+            await self.goto(page, self.person_page_url)
+        finally:
+            page.remove_listener("response", on_response)
+        if captured:
+            payload = await captured[0].json()
+        else:
+            # 首屏动态可能直接渲染在页面中，此时直接请求第一页
+            payload = await self.get_json(
+                page.request, get_activities_first_page_url(self.people)
+            )
+
+        items = []
+        latest_found = False
+        i = 1
+        while True:
+            self.logger.info(f"第{i}页动态")
+            for data in payload.get("data") or []:
+                acted_at = activity_acted_at(data)
+                if is_sticky(data):
+                    self.logger.warning(f"忽略置顶项：{data.get('action_text')}")
+                    continue
+                if not latest_found:
+                    self.logger.info(f"最新动态时间：{acted_at}")
+                    self.latest_dt = acted_at
+                    latest_found = True
+                if self.reached_until(acted_at, until):
+                    self.logger.info(
+                        f"当前动态时间：{acted_at} 早于停止时间：{until}, 将停止本次抓取"
+                    )
+                    return items
+                item = parse_activity(data)
+                if item is None:
+                    self.logger.warning(f"忽略该类型: {data.get('action_text')}")
+                    continue
+                if self.is_seen(item):
+                    self.logger.info(f"已抓取过该动态，跳过：{item['target']['title']}")
+                    continue
+                self.logger.info(
+                    f"于{acted_at} {data.get('action_text')}\n\t{item['target']['title']}"
+                )
+                items.append(item)
+            if not (next_url := get_next_page_url(payload)):
+                return items
+            payload = await self.get_json(page.request, next_url)
+            i += 1
+
     async def save_and_push(self, items: list["ActivityItem"]):
         if not items:
             self.logger.info("No items, will do nothing.")
             return
-        filename = f"{dt_str()}.json"
-        filepath = self.tasks_dir.joinpath(filename)
-        with open(filepath, "w") as fp:
-            json.dump(items, fp, ensure_ascii=False, indent=2, cls=JSONEncoder)
+        filepath = None
+        if self.task_granularity == TaskGranularity.FILE:
+            # 文件任务由Archiver从本地读取，不经过storage
+            filepath = self.tasks_dir.joinpath(f"{dt_str()}.json")
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            with open(filepath, "w") as fp:
+                json.dump(items, fp, ensure_ascii=False, indent=2, cls=JSONEncoder)
+                self.logger.info(f"Save {len(items)} items to {filepath}.")
+        elif self.save_task_file:
+            filepath = self.tasks_dir.joinpath(f"{dt_str()}.json")
+            await self.write_bytes(
+                filepath,
+                json.dumps(items, ensure_ascii=False, indent=2, cls=JSONEncoder).encode(
+                    "utf-8"
+                ),
+            )
             self.logger.info(f"Save {len(items)} items to {filepath}.")
-        task = ArchiveTask(filepath)
-        await self.push_task(task)
-        self.logger.info(f"Push a task {task} to task list")
+        if catalog := get_catalog():
+            await catalog.add_items(self.people, items)
+        if self.task_granularity == TaskGranularity.FILE:
+            task = ArchiveTask(filepath, people=self.people, queued_at=time.time())
+            await self.push_task(task)
+            self.logger.info(f"Push a task {task} to task list")
+        else:
+            queued_at = time.time()
+            tasks = [
+                ArchiveTask(item=item, people=self.people, queued_at=queued_at)
+                for item in items
+            ]
+            await self.push_tasks(tasks)
+            self.logger.info(f"Push {len(tasks)} item tasks to task list")
 
     async def _run(self, playwright, headless=True, **context_extra):
         self.logger.info("Starting a new fetch loop...")
+        await self.load_seen(self.fetch_until)
+        if self.fast_poll and not await self.poller.has_new(
+            playwright, self.fetch_until
+        ):
+            self.logger.info("No new activities, wait for next fetch loop")
+            await self.observe_activities([])
+            return []
         async with self.get_context(
             playwright,
             browser_headless=headless,
@@ -201,8 +433,91 @@ class Monitor(BaseWorker):
         ) as context:
             page = await self.new_page(context)
             page.set_default_timeout(self.page_default_timeout)
-            await self.goto(page, self.person_page_url)
-            results = await self.fetch(self.fetch_until, page)
+            if self.fetch_mode == FetchMode.API:
+                results = await self.fetch_from_api(self.fetch_until, page)
+                self.fetch_until = self.latest_dt
+            else:
+                await self.goto(page, self.person_page_url)
+                results = await self.fetch(self.fetch_until, page)
             await self.save_and_push(results)
+            await self.mark_seen(results)
+            await self.observe_activities(results)
             self.logger.info("Done, wait for next fetch loop")
             return results
+
+
+class MultiMonitor:
+    """
+    在一个进程中监测多个用户
+
+    每个用户一个按用户区分Redis键的`Monitor`，它们共享同一个Redis连接池和浏览器池
+    （同一state文件共用一个浏览器上下文，每个用户使用各自的标签页），
+    同时抓取的用户数不超过`max_concurrency`
+    """
+
+    name = Monitor.name
+    people_key = f"{Monitor.redis_key_prefix}:{Monitor.name}:people"  # set
+
+    def __init__(
+        self,
+        people_list: list[str],
+        init_state_path: str | pathlib.Path = None,
+        fetch_until: datetime = datetime.now()
+        - timedelta(days=settings.monitor_fetch_until),
+        interval=60 * 5,
+        max_concurrency: int = settings.monitor_max_concurrency,
+    ):
+        self.logger = logging.getLogger(self.name)
+        self.run_limiter = asyncio.Semaphore(max(1, max_concurrency))
+        self.monitors: list[Monitor] = []
+        redis = None
+        page_stats = {}
+        page_workers = {}
+        # 所有用户共享检查预算
+        scheduler = AdaptiveScheduler() if settings.monitor_adaptive_interval else None
+        for people in dict.fromkeys(people_list):
+            monitor = Monitor(
+                people,
+                init_state_path,
+                fetch_until=fetch_until,
+                interval=interval,
+                scope=people,
+                redis=redis,
+            )
+            redis = monitor.redis
+            # 共享的浏览器上下文的请求路由由第一个Monitor处理，
+            # 按打开页面的Monitor的resource_policy拦截，页面统计及所属需共享
+            monitor._page_stats = page_stats
+            monitor._page_workers = page_workers
+            monitor.run_limiter = self.run_limiter
+            monitor.scheduler = scheduler
+            self.monitors.append(monitor)
+        self.redis = redis
+
+    def stop(self):
+        for monitor in self.monitors:
+            monitor.stop()
+
+    async def run(self, headless=True, **context_extra):
+        people_list = [m.people for m in self.monitors]
+        self.logger.info(f"Monitor {len(people_list)} people: {people_list}")
+        await self.redis.sadd(self.people_key, *people_list)
+        async with async_playwright() as playwright:
+            browser_pool = BrowserPool(
+                playwright,
+                browser_headless=headless,
+                init=self.monitors[0].init_context,
+                logger=self.logger,
+                **context_extra,
+            )
+            try:
+                await asyncio.gather(
+                    *(
+                        monitor.run(
+                            headless, browser_pool=browser_pool, **context_extra
+                        )
+                        for monitor in self.monitors
+                    )
+                )
+            finally:
+                await browser_pool.close()
@@ -0,0 +1,276 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import pathlib
+import tarfile
+import time
+from datetime import date
+from functools import lru_cache
+from typing import Any
+
+from archive.core.blobs import BlobStore
+
+logger = logging.getLogger("default")
+
+PACK_SUFFIX = ".tar"
+INDEX_SUFFIX = ".tar.index.json"
+OUTPUT_NAMES = ("activities", "archives")
+CHUNK_SIZE = 1024 * 1024
+
+
+class PackError(Exception):
+    pass
+
+
+def pack_path(day_dir: pathlib.Path) -> pathlib.Path:
+    return day_dir.with_name(f"{day_dir.name}{PACK_SUFFIX}")
+
+
+def index_path(day_dir: pathlib.Path) -> pathlib.Path:
+    return day_dir.with_name(f"{day_dir.name}{INDEX_SUFFIX}")
+
+
+def day_of(day_dir: pathlib.Path) -> date | None:
+    """`<Y>/<m>/<d>`目录对应的日期"""
+    try:
+        return date(
+            int(day_dir.parent.parent.name), int(day_dir.parent.name), int(day_dir.name)
+        )
+    except ValueError:
+        return None
+
+
+def find_day_dirs(results_dir: pathlib.Path, before: date) -> list[pathlib.Path]:
+    """所有用户的activities和archives中早于`before`且存在未打包文件的日期目录"""
+    day_dirs = []
+    for output_name in OUTPUT_NAMES:
+        for day_dir in results_dir.glob(f"*/{output_name}/*/*/*"):
+            if not day_dir.is_dir():
+                continue
+            day = day_of(day_dir)
+            if day is not None and day < before:
+                day_dirs.append(day_dir)
+    return sorted(day_dirs)
+
+
+def find_packs(results_dir: pathlib.Path) -> list[pathlib.Path]:
+    return sorted(
+        pack
+        for output_name in OUTPUT_NAMES
+        for pack in results_dir.glob(f"*/{output_name}/*/*/*{PACK_SUFFIX}")
+    )
+
+
+def file_sha256(path: pathlib.Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fp:
+        while chunk := fp.read(CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def read_range(path: pathlib.Path, offset: int, size: int) -> bytes:
+    with open(path, "rb") as fp:
+        fp.seek(offset)
+        return fp.read(size)
+
+
+@lru_cache(maxsize=256)
+def _load_index(path: str, mtime_ns: int) -> dict[str, Any]:
+    with open(path, encoding="utf-8") as fp:
+        return json.load(fp)
+
+
+def load_index(day_dir: pathlib.Path) -> dict[str, Any] | None:
+    """
+    打包索引：{"files": {相对路径: {"offset", "size", "sha256"}}}，
+    内容已在BlobStore中的文件不写入包内，记录为{"blob", "size", "sha256"}，blob为相对results_dir的路径
+    """
+    path = index_path(day_dir)
+    try:
+        return _load_index(str(path), path.stat().st_mtime_ns)
+    except FileNotFoundError:
+        return None
+
+
+def locate(
+    results_dir: pathlib.Path, relpath: str
+) -> tuple[pathlib.Path, int, int] | None:
+    """
+    结果目录中的文件的实际位置(文件, 偏移, 大小)：先查找未打包的文件，再查找所在日期的包
+    """
+    path = results_dir.joinpath(relpath)
+    if path.is_file():
+        return path, 0, path.stat().st_size
+    parts = pathlib.PurePosixPath(relpath).parts
+    # <people>/<output_name>/<Y>/<m>/<d>/...
+    if len(parts) < 6 or parts[1] not in OUTPUT_NAMES:
+        return None
+    day_dir = results_dir.joinpath(*parts[:5])
+    index = load_index(day_dir)
+    if index is None or (entry := index["files"].get("/".join(parts[5:]))) is None:
+        return None
+    if "blob" in entry:
+        return results_dir.joinpath(entry["blob"]), 0, entry["size"]
+    return pack_path(day_dir), entry["offset"], entry["size"]
+
+
+def read_file(results_dir: pathlib.Path, relpath: str) -> bytes | None:
+    if (location := locate(results_dir, relpath)) is None:
+        return None
+    return read_range(*location)
+
+
+def list_files(results_dir: pathlib.Path, day_dir: pathlib.Path) -> list[str]:
+    """日期目录中所有文件（包括已打包的）相对日期目录的路径"""
+    names = set()
+    if index := load_index(day_dir):
+        names.update(index["files"])
+    if day_dir.is_dir():
+        names.update(
+            p.relative_to(day_dir).as_posix() for p in day_dir.rglob("*") if p.is_file()
+        )
+    return sorted(names)
+
+
+def verify(
+    results_dir: pathlib.Path,
+    pack: pathlib.Path,
+    index: dict[str, Any],
+) -> list[str]:
+    """按索引读取每个文件并校验sha256，返回错误"""
+    errors = []
+    for name, entry in index["files"].items():
+        if "blob" in entry:
+            path, offset = results_dir.joinpath(entry["blob"]), 0
+        else:
+            path, offset = pack, entry["offset"]
+        try:
+            data = read_range(path, offset, entry["size"])
+        except OSError as e:
+            errors.append(f"{name}: {e!r}")
+            continue
+        if len(data) != entry["size"]:
+            errors.append(f"{name}: truncated")
+        elif hashlib.sha256(data).hexdigest() != entry["sha256"]:
+            errors.append(f"{name}: sha256 mismatch")
+    return errors
+
+
+def verify_day(results_dir: pathlib.Path, day_dir: pathlib.Path) -> list[str]:
+    if (index := load_index(day_dir)) is None:
+        return [f"{index_path(day_dir)}: not found"]
+    return verify(results_dir, pack_path(day_dir), index)
+
+
+def _remove_empty_dirs(directory: pathlib.Path):
+    for d in sorted(directory.rglob("*"), key=lambda p: len(p.parts), reverse=True):
+        if d.is_dir() and not any(d.iterdir()):
+            d.rmdir()
+    if not any(directory.iterdir()):
+        directory.rmdir()
+
+
+def is_temporary(path: pathlib.Path) -> bool:
+    """写入中的临时文件，如LocalFileWriter的`.<name>.tmp`"""
+    return path.name.startswith(".") or path.suffix == ".tmp"
+
+
+def pack_day(
+    results_dir: pathlib.Path,
+    day_dir: pathlib.Path,
+    blob_store: BlobStore = None,
+    delete: bool = True,
+    grace_period: float = 0,
+) -> int:
+    """
+    将日期目录打包为同级的`<d>.tar`，并写入索引`<d>.tar.index.json`，返回打包的文件数
+
+    已有包时合并包内的文件（日期目录在打包后又有写入），同名时以未打包的文件为准。
+    内容已在`blob_store`中的文件（截图的硬链接）只在索引中引用blob，删除后日期目录不再占用inode，
+    BlobStore中的链接记录改为包内的位置。
+    临时文件不打包，`grace_period`秒内有文件写入的目录跳过，留到下次打包。
+    新的包写入临时文件并按索引校验通过后才替换原有的包，之后删除未打包的文件。
+    """
+    pack = pack_path(day_dir)
+    old_index = load_index(day_dir) or {"files": {}}
+    paths = [p for p in sorted(day_dir.rglob("*")) if p.is_file()]
+    if grace_period and any(
+        p.stat().st_mtime > time.time() - grace_period for p in paths
+    ):
+        logger.info(f"Skip {day_dir}: written in the last {grace_period}s")
+        return 0
+    loose = {
+        p.relative_to(day_dir).as_posix(): p
+        for p in paths
+        if not any(is_temporary(part) for part in p.relative_to(day_dir).parents)
+        and not is_temporary(p)
+    }
+    if not loose:
+        if delete:
+            _remove_empty_dirs(day_dir)
+        return 0
+    files = {}
+    blob_links = {}  # 链接到blob的文件 -> 包内的位置
+    tmp = pack.with_name(f".{pack.name}.{os.getpid()}.tmp")
+    with tarfile.open(tmp, "w", format=tarfile.PAX_FORMAT) as tar:
+        for name, entry in old_index["files"].items():
+            if name in loose:
+                continue
+            if "blob" in entry:
+                files[name] = entry
+                continue
+            info = tarfile.TarInfo(name)
+            info.size = entry["size"]
+            data = read_range(pack, entry["offset"], entry["size"])
+            tar.addfile(info, io.BytesIO(data))
+            files[name] = {"size": entry["size"], "sha256": entry["sha256"]}
+        for name, path in loose.items():
+            sha256 = file_sha256(path)
+            size = path.stat().st_size
+            if blob_store and (blob := blob_store.find_blob(sha256)):
+                files[name] = {
+                    "blob": blob.relative_to(results_dir).as_posix(),
+                    "size": size,
+                    "sha256": sha256,
+                }
+                blob_links[path] = f"{pack}#{name}"
+                continue
+            # 硬链接按普通文件写入内容，而不是tar的链接条目
+            info = tar.gettarinfo(path, arcname=name)
+            info.type = tarfile.REGTYPE
+            info.linkname = ""
+            info.size = size
+            with open(path, "rb") as fp:
+                tar.addfile(info, fp)
+            files[name] = {"size": size, "sha256": sha256}
+    with tarfile.open(tmp) as tar:
+        for member in tar.getmembers():
+            files[member.name]["offset"] = member.offset_data
+    index = {"files": files}
+    errors = verify(results_dir, tmp, index)
+    if errors:
+        tmp.unlink()
+        raise PackError(f"Verify {day_dir} failed: {errors[:5]}")
+    with open(tmp, "rb+") as fp:
+        os.fsync(fp.fileno())
+    index_tmp = tmp.with_suffix(".index.tmp")
+    with open(index_tmp, "w", encoding="utf-8") as fp:
+        json.dump(index, fp, ensure_ascii=False)
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(tmp, pack)
+    os.replace(index_tmp, index_path(day_dir))
+    if errors := verify_day(results_dir, day_dir):
+        raise PackError(f"Verify {pack} failed: {errors[:5]}")
+    if delete:
+        # 只删除已打包的文件，打包过程中新写入的文件留到下次打包
+        for path in loose.values():
+            path.unlink()
+        _remove_empty_dirs(day_dir)
+        if blob_links:
+            blob_store.move_links(blob_links)
+    logger.info(f"Packed {len(loose)} files into {pack}, {len(files)} in total")
+    return len(loose)
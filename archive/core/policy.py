@@ -0,0 +1,116 @@
+import time
+import typing
+from collections import Counter
+from typing import Any
+
+if typing.TYPE_CHECKING:
+    from playwright.async_api import Request, Response
+
+# 截图依赖这些资源，不允许拦截
+PROTECTED_RESOURCE_TYPES = {"document", "stylesheet", "image"}
+# 长连接，不计入进行中的请求
+LONG_LIVED_RESOURCE_TYPES = {"websocket", "eventsource"}
+
+
+def str_list(value: list[str] | None, name: str) -> list[str]:
+    """字符串列表，单个字符串会被当作字符序列，需拒绝"""
+    if value is None:
+        return []
+    if not isinstance(value, (list, tuple)) or not all(
+        isinstance(v, str) for v in value
+    ):
+        raise ValueError(f"{name} must be a list of strings: {value!r}")
+    return list(value)
+
+
+class ResourcePolicy:
+    """
+    资源加载策略
+
+    按资源类型（Playwright的`request.resource_type`，如font, media）和URL关键字拦截请求
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        blocked_resource_types: list[str] = None,
+        blocked_url_keywords: list[str] = None,
+    ):
+        if not isinstance(enabled, bool):
+            raise ValueError(f"enabled must be a boolean: {enabled!r}")
+        self.enabled = enabled
+        self.blocked_resource_types = [
+            t
+            for t in str_list(blocked_resource_types, "blocked_resource_types")
+            if t not in PROTECTED_RESOURCE_TYPES
+        ]
+        self.blocked_url_keywords = str_list(
+            blocked_url_keywords, "blocked_url_keywords"
+        )
+
+    def should_block(self, request: "Request") -> bool:
+        if not self.enabled:
+            return False
+        if request.resource_type in self.blocked_resource_types:
+            return True
+        url = request.url
+        return any(keyword in url for keyword in self.blocked_url_keywords)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "blocked_resource_types": self.blocked_resource_types,
+            "blocked_url_keywords": self.blocked_url_keywords,
+        }
+
+    @classmethod
+    def from_dict(cls, value: "dict[str, Any] | ResourcePolicy") -> "ResourcePolicy":
+        if isinstance(value, cls):
+            return value
+        return cls(**value)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}<{self.to_dict()}>"
+
+
+class PageResourceStats:
+    """单个页面的请求统计，同时记录进行中的请求用于判断网络是否空闲"""
+
+    def __init__(self):
+        self.blocked = Counter()  # resource_type -> count
+        self.loaded_requests = 0
+        self.loaded_bytes = 0
+        self.inflight: set["Request"] = set()
+        self.last_activity = time.monotonic()
+        self.ready_wait = 0.0  # seconds，等待页面就绪的总时间
+
+    def on_request(self, request: "Request"):
+        if request.resource_type not in LONG_LIVED_RESOURCE_TYPES:
+            self.inflight.add(request)
+            self.last_activity = time.monotonic()
+
+    def on_request_done(self, request: "Request"):
+        if request in self.inflight:
+            self.inflight.discard(request)
+            self.last_activity = time.monotonic()
+
+    def on_blocked(self, request: "Request"):
+        self.blocked[request.resource_type] += 1
+
+    def on_response(self, response: "Response"):
+        self.loaded_requests += 1
+        try:
+            self.loaded_bytes += int(response.headers.get("content-length", 0))
+        except ValueError:
+            pass
+
+    @property
+    def blocked_requests(self) -> int:
+        return sum(self.blocked.values())
+
+    def __str__(self):
+        return (
+            f"blocked {self.blocked_requests} requests {dict(self.blocked)}, "
+            f"loaded {self.loaded_requests} requests ({self.loaded_bytes / 1024:.1f} KiB), "
+            f"waited {self.ready_wait:.2f}s for readiness"
+        )
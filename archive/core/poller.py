@@ -0,0 +1,87 @@
+import contextlib
+import pathlib
+import typing
+from datetime import datetime
+
+from playwright.async_api import APIRequestContext, Playwright
+
+from archive.core.browser import StateVersion
+from archive.core.feed import (
+    activity_acted_at,
+    get_activities_first_page_url,
+    get_next_page_url,
+    is_sticky,
+    parse_activity,
+)
+from archive.env import user_agent
+
+if typing.TYPE_CHECKING:
+    from archive.core.monitor import Monitor
+
+
+class ActivityPoller:
+    """
+    无浏览器的动态轮询
+
+    使用state文件中的cookies直接请求动态接口，只有出现新动态时Monitor才需要打开浏览器。
+    请求上下文（连接池）在多次轮询间复用，state文件中的cookies变化时重建。
+    """
+
+    def __init__(self, monitor: "Monitor"):
+        self.monitor = monitor
+        self.logger = monitor.logger
+        self._playwright: Playwright | None = None
+        self._request: APIRequestContext | None = None
+        self._state_path: str | pathlib.Path | None = None
+        self._state_version: StateVersion | None = None
+
+    async def get_request_context(
+        self, playwright: Playwright, state_path: str | pathlib.Path
+    ) -> APIRequestContext:
+        if self._request and (
+            playwright is not self._playwright
+            or str(state_path) != str(self._state_path)
+            or self._state_version.changed()
+        ):
+            await self.close()
+        if not self._request:
+            self._request = await playwright.request.new_context(
+                storage_state=state_path,
+                user_agent=user_agent,
+            )
+            self._playwright = playwright
+            self._state_path = state_path
+            self._state_version = StateVersion(state_path)
+        return self._request
+
+    async def has_new(self, playwright: Playwright, until: datetime) -> bool:
+        """
+        第一页中有晚于`until`且未抓取过的动态，或第一页的动态都不需要存档但还未到达`until`时
+        （更早的动态可能需要存档）返回True
+        """
+        state_path = await self.monitor.get_state_path()
+        request = await self.get_request_context(playwright, state_path)
+        payload = await self.monitor.get_json(
+            request, get_activities_first_page_url(self.monitor.people, limit=5)
+        )
+        for data in payload.get("data") or []:
+            if is_sticky(data):
+                continue
+            acted_at = activity_acted_at(data)
+            if self.monitor.reached_until(acted_at, until):
+                return False
+            item = parse_activity(data)
+            if item and not self.monitor.is_seen(item):
+                self.logger.info(f"新动态时间：{acted_at}, 停止时间：{until}")
+                return True
+        if get_next_page_url(payload) is None:
+            return False
+        self.logger.info(f"第一页未到达停止时间：{until}，交由完整抓取")
+        return True
+
+    async def close(self):
+        if self._request:
+            with contextlib.suppress(Exception):
+                await self._request.dispose()
+        self._request = None
+        self._playwright = None
@@ -0,0 +1,207 @@
+import asyncio
+import contextlib
+import logging
+import time
+
+from redis import asyncio as aioredis
+
+from archive.config import settings
+
+logger = logging.getLogger("default")
+
+
+class TaskQueue:
+    """
+    可靠任务队列
+
+    - `key`: list，待处理的任务
+    - `key:processing`: list，通过BLMOVE从待处理列表移入，确认(ack)后删除
+    - `key:leases`: hash，任务 -> 可见性超时的截止时间戳，超时未确认的任务会重新入队
+    - `key:attempts`: hash，任务 -> 已失败次数
+    - `key:delayed`: sorted set，失败后等待重试的任务，score为重新入队的时间戳（指数退避）
+    - `key:dead`: list，超出最大重试次数的任务
+    """
+
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        key: str,
+        visibility_timeout: int = settings.task_visibility_timeout,
+        max_retries: int = settings.task_max_retries,
+        retry_backoff: int = settings.task_retry_backoff,
+        reap_interval: float = settings.task_reap_interval,
+    ):
+        self.redis = redis
+        self.key = key
+        self.visibility_timeout = visibility_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.reap_interval = reap_interval
+        self._next_reap_at = 0.0  # time.monotonic()
+
+    @property
+    def processing_key(self):
+        return f"{self.key}:processing"
+
+    @property
+    def leases_key(self):
+        return f"{self.key}:leases"
+
+    @property
+    def attempts_key(self):
+        return f"{self.key}:attempts"
+
+    @property
+    def delayed_key(self):
+        return f"{self.key}:delayed"
+
+    @property
+    def dead_key(self):
+        return f"{self.key}:dead"
+
+    async def push(self, *values: str):
+        return await self.redis.rpush(self.key, *values)
+
+    async def pop(self, block_timeout: int = 0) -> str | None:
+        """
+        取出一个任务并移入处理中列表，`block_timeout`秒内没有任务则返回None，0表示不阻塞
+        """
+        await self.requeue_due()
+        if block_timeout > 0:
+            value = await self.redis.blmove(
+                self.key, self.processing_key, block_timeout
+            )
+        else:
+            value = await self.redis.lmove(self.key, self.processing_key)
+        if value is not None:
+            await self.redis.hset(
+                self.leases_key, value, time.time() + self.visibility_timeout
+            )
+        return value
+
+    async def extend(self, value: str):
+        await self.redis.hset(
+            self.leases_key, value, time.time() + self.visibility_timeout
+        )
+
+    @contextlib.asynccontextmanager
+    async def hold(self, value: str):
+        """处理期间定时续期，避免长任务被当作超时重新入队"""
+
+        async def heartbeat():
+            while True:
+                await asyncio.sleep(max(1, self.visibility_timeout // 3))
+                await self.extend(value)
+
+        task = asyncio.create_task(heartbeat())
+        try:
+            yield
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    async def _remove_processing(self, value: str) -> int:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.lrem(self.processing_key, 1, value)
+            pipe.hdel(self.leases_key, value)
+            removed, _ = await pipe.execute()
+        return removed
+
+    async def ack(self, value: str):
+        await self._remove_processing(value)
+        await self.redis.hdel(self.attempts_key, value)
+
+    async def release(self, value: str):
+        """放回队首，不计入失败次数"""
+        if await self._remove_processing(value):
+            await self.redis.lpush(self.key, value)
+
+    async def fail(self, value: str) -> bool:
+        """
+        标记任务失败，未超出最大重试次数时延迟重新入队，否则移入死信列表。返回是否进入死信列表
+        """
+        if not await self._remove_processing(value):
+            return False
+        return await self._retry_or_bury(value)
+
+    async def _retry_or_bury(self, value: str) -> bool:
+        attempts = await self.redis.hincrby(self.attempts_key, value, 1)
+        if attempts > self.max_retries:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.rpush(self.dead_key, value)
+                pipe.hdel(self.attempts_key, value)
+                await pipe.execute()
+            logger.warning(f"Task failed {attempts} times, move to dead list: {value}")
+            return True
+        delay = self.retry_backoff * 2 ** (attempts - 1)
+        await self.redis.zadd(self.delayed_key, {value: time.time() + delay})
+        logger.info(f"Task failed {attempts} times, retry in {delay}s: {value}")
+        return False
+
+    async def requeue_due(self, force=False):
+        """
+        重新入队：到期的延迟任务和可见性超时的任务
+
+        延迟任务只在队首（最早到期的任务）到期时才读取，
+        可见性超时的检查需要读取所有租约，每`reap_interval`秒最多执行一次，`force`时立即执行
+        """
+        if force or time.monotonic() >= self._next_reap_at:
+            self._next_reap_at = time.monotonic() + self.reap_interval
+            await self.reap_expired()
+        await self.requeue_delayed()
+
+    async def requeue_delayed(self):
+        now = time.time()
+        head = await self.redis.zrange(self.delayed_key, 0, 0, withscores=True)
+        if not head or head[0][1] > now:
+            return
+        for value in await self.redis.zrangebyscore(self.delayed_key, "-inf", now):
+            # 多个消费者同时执行时，只有成功删除的一方负责入队
+            if await self.redis.zrem(self.delayed_key, value):
+                await self.redis.rpush(self.key, value)
+
+    async def reap_expired(self):
+        now = time.time()
+        leases = await self.redis.hgetall(self.leases_key)
+        for value in await self.redis.lrange(self.processing_key, 0, -1):
+            deadline = leases.get(value)
+            if deadline is None:
+                # 移入处理中列表后还未来得及设置租约（如进程崩溃），从现在开始计时
+                await self.redis.hsetnx(
+                    self.leases_key, value, now + self.visibility_timeout
+                )
+            elif float(deadline) < now:
+                logger.warning(f"Task visibility timeout: {value}")
+                if await self._remove_processing(value):
+                    await self._retry_or_bury(value)
+
+    async def stats(self) -> dict[str, int]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.llen(self.key)
+            pipe.llen(self.processing_key)
+            pipe.zcard(self.delayed_key)
+            pipe.llen(self.dead_key)
+            pending, processing, delayed, dead = await pipe.execute()
+        return {
+            "pending": pending,
+            "processing": processing,
+            "delayed": delayed,
+            "dead": dead,
+        }
+
+    async def dead_tasks(self, start: int = 0, end: int = -1) -> list[str]:
+        return await self.redis.lrange(self.dead_key, start, end)
+
+    async def requeue_dead(self) -> int:
+        count = 0
+        while await self.redis.lmove(self.dead_key, self.key) is not None:
+            count += 1
+        return count
+
+    async def clear_dead(self) -> int:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.llen(self.dead_key)
+            pipe.delete(self.dead_key)
+            count, _ = await pipe.execute()
+        return count
@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+from playwright.async_api import Page
+
+from archive.config import settings
+from archive.core.policy import PageResourceStats
+from archive.utils.js import wait_dom_settled_js, wait_images_ready_js
+
+
+class ReadinessReport:
+    """一次就绪等待中各信号的耗时"""
+
+    def __init__(self):
+        self.waits: dict[str, float] = {}
+        self.timed_out: list[str] = []
+
+    @property
+    def total(self) -> float:
+        return sum(self.waits.values())
+
+    def add(self, signal: str, elapsed: float, ok: bool = True):
+        self.waits[signal] = self.waits.get(signal, 0) + elapsed
+        if not ok:
+            self.timed_out.append(signal)
+
+    def __str__(self):
+        detail = ", ".join(f"{k} {v:.2f}s" for k, v in self.waits.items())
+        s = f"ready in {self.total:.2f}s ({detail})"
+        if self.timed_out:
+            s += f", timed out: {self.timed_out}"
+        return s
+
+
+class PageReadiness:
+    """
+    页面就绪等待，代替固定的sleep
+
+    依次等待：图片加载并解码、网络空闲`network_quiet`秒、DOM在`dom_quiet`秒内无变化，
+    所有等待共享`max_wait`秒的上限，超时后不再等待，由调用方继续处理。
+    """
+
+    def __init__(
+        self,
+        max_wait: float = settings.readiness_max_wait,
+        network_quiet: float = settings.readiness_network_quiet,
+        dom_quiet: float = settings.readiness_dom_quiet,
+    ):
+        self.max_wait = max_wait
+        self.network_quiet = network_quiet
+        self.dom_quiet = dom_quiet
+
+    async def images_ready(self, page: Page, selector: str, timeout: float) -> bool:
+        result = await page.evaluate(
+            wait_images_ready_js, [selector, int(timeout * 1000)]
+        )
+        return result["pending"] == 0
+
+    async def network_idle(self, stats: PageResourceStats, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            now = time.monotonic()
+            idle_for = now - stats.last_activity
+            if not stats.inflight and idle_for >= self.network_quiet:
+                return True
+            if now >= deadline:
+                return False
+            delay = 0.05 if stats.inflight else self.network_quiet - idle_for
+            await asyncio.sleep(max(0.01, min(delay, deadline - now)))
+
+    async def dom_settled(self, page: Page, timeout: float = None) -> bool:
+        timeout = self.max_wait if timeout is None else timeout
+        return await page.evaluate(
+            wait_dom_settled_js,
+            [int(self.dom_quiet * 1000), int(max(timeout, self.dom_quiet) * 1000)],
+        )
+
+    async def wait(
+        self,
+        page: Page,
+        stats: PageResourceStats = None,
+        image_selector: str = None,
+    ) -> ReadinessReport:
+        report = ReadinessReport()
+        deadline = time.monotonic() + self.max_wait
+        steps = []
+        if image_selector:
+            steps.append(
+                ("images", lambda t: self.images_ready(page, image_selector, t))
+            )
+        if stats is not None:
+            steps.append(("network", lambda t: self.network_idle(stats, t)))
+        steps.append(("dom", lambda t: self.dom_settled(page, t)))
+        for signal, wait in steps:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                report.timed_out.append(signal)
+                continue
+            start = time.monotonic()
+            ok = await wait(remaining)
+            report.add(signal, time.monotonic() - start, ok)
+        if stats is not None:
+            stats.ready_wait += report.total
+        return report
@@ -0,0 +1,87 @@
+import bisect
+import time
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from archive.config import settings
+from archive.utils.limiter import RateLimiter
+
+
+class AdaptiveScheduler:
+    """
+    自适应的检查间隔
+
+    根据每个用户最近`lookback`秒内的动态估计其平均动态间隔，
+    每个动态间隔内检查`polls_per_activity`次，并限制在[min_interval, max_interval]内。
+    所有用户合计每分钟的检查次数超出`polls_per_minute`时按比例拉长所有间隔，
+    同时通过速率限制保证不超出预算。
+    """
+
+    def __init__(
+        self,
+        min_interval: int = settings.monitor_min_interval,
+        max_interval: int = settings.monitor_max_interval,
+        polls_per_minute: float = settings.monitor_polls_per_minute,
+        lookback: int = settings.monitor_activity_lookback,
+        polls_per_activity: float = 2,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.polls_per_minute = polls_per_minute
+        self.lookback = lookback
+        self.polls_per_activity = polls_per_activity
+        self.limiter = RateLimiter(polls_per_minute / 60)
+        self._acted_ats: dict[str, list[float]] = {}  # 按时间排序的动态时间戳
+        self._next_due: dict[str, datetime] = {}
+
+    def known(self, people: str) -> bool:
+        return people in self._acted_ats
+
+    def observe(self, people: str, acted_ats: Iterable[datetime | float]):
+        timestamps = self._acted_ats.setdefault(people, [])
+        for acted_at in acted_ats:
+            ts = acted_at.timestamp() if isinstance(acted_at, datetime) else acted_at
+            bisect.insort(timestamps, ts)
+        cutoff = time.time() - self.lookback
+        del timestamps[: bisect.bisect_left(timestamps, cutoff)]
+
+    def _window(self, people: str) -> float:
+        # 历史不足lookback时按实际跨度计算，但不短于max_interval，避免少量动态造成抖动
+        timestamps = self._acted_ats.get(people)
+        span = time.time() - timestamps[0] if timestamps else self.lookback
+        return min(self.lookback, max(self.max_interval, span))
+
+    def activity_rate(self, people: str) -> float:
+        """最近的动态频率，次/小时"""
+        return len(self._acted_ats.get(people, [])) / self._window(people) * 3600
+
+    def base_interval(self, people: str) -> float:
+        count = len(self._acted_ats.get(people, []))
+        if not count:
+            return self.max_interval
+        interval = self._window(people) / count / self.polls_per_activity
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def interval(self, people: str) -> float:
+        intervals = {p: self.base_interval(p) for p in self._acted_ats}
+        intervals.setdefault(people, self.base_interval(people))
+        load = sum(60 / i for i in intervals.values())  # 每分钟检查次数
+        factor = 1.0
+        if self.polls_per_minute > 0 and load > self.polls_per_minute:
+            factor = load / self.polls_per_minute
+        return min(self.max_interval, intervals[people] * factor)
+
+    def schedule(self, people: str) -> datetime:
+        """计算并记录下次检查时间"""
+        due = datetime.now() + timedelta(seconds=self.interval(people))
+        self._next_due[people] = due
+        return due
+
+    def next_due(self, people: str = None) -> datetime | dict[str, datetime] | None:
+        if people is None:
+            return dict(self._next_due)
+        return self._next_due.get(people)
+
+    async def acquire(self):
+        """所有用户共享的检查预算"""
+        await self.limiter.wait()
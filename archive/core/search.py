@@ -0,0 +1,64 @@
+import base64
+import json
+import re
+from typing import Any
+
+# 中日韩字符按相邻两字切分（bigram），其他字符按单词切分
+CJK_RANGES = (
+    "\u3040-\u30ff"  # 日文假名
+    "\u3400-\u4dbf"  # CJK扩展A
+    "\u4e00-\u9fff"  # CJK统一汉字
+    "\uf900-\ufaff"  # CJK兼容汉字
+    "\uac00-\ud7af"  # 韩文
+)
+TOKEN_RE = re.compile(f"([{CJK_RANGES}]+)|([^\\W_{CJK_RANGES}]+)")
+
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for cjk, word in TOKEN_RE.findall(text or ""):
+        if cjk:
+            if len(cjk) == 1:
+                tokens.append(cjk)
+            else:
+                tokens.extend(cjk[i : i + 2] for i in range(len(cjk) - 1))
+        else:
+            tokens.append(word.lower())
+    return tokens
+
+
+def cjk_chars(text: str) -> list[str]:
+    """所有的中日韩单字"""
+    return [c for cjk, _ in TOKEN_RE.findall(text or "") if cjk for c in cjk]
+
+
+def index_text(text: str) -> str:
+    """
+    写入FTS5的文本：按空格分隔的词，FTS5使用默认的unicode61分词。
+    单字写在所有词之后，bigram短语依然相邻，单字搜索可以匹配任意位置的汉字
+    """
+    return " ".join(tokenize(text) + cjk_chars(text))
+
+
+def match_query(query: str) -> str | None:
+    """
+    搜索词转为FTS5的MATCH表达式：每个词的bigram组成短语，多个词之间为AND。
+    单个汉字匹配索引中的单字
+    """
+    phrases = []
+    for term in query.split():
+        tokens = tokenize(term)
+        if tokens:
+            phrases.append(f'"{" ".join(tokens)}"')
+    return " ".join(phrases) or None
+
+
+def encode_cursor(key: Any, rowid: int) -> str:
+    """分页游标：上一页最后一条的排序值和rowid"""
+    raw = json.dumps([key, rowid]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[Any, int]:
+    key, rowid = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    return key, int(rowid)
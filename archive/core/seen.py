@@ -0,0 +1,186 @@
+import abc
+import asyncio
+import hashlib
+import pathlib
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Iterable
+from urllib import parse
+
+from redis import asyncio as aioredis
+
+from archive.core.base import ActivityItem, BaseWorker
+from archive.utils.common import dt_fromisoformat
+
+
+def activity_fingerprint(item: ActivityItem) -> str:
+    """
+    动态的稳定指纹：(动作, 目标链接, 动态时间)
+
+    动态页的时间只精确到分钟，接口返回的时间精确到秒，统一截断到分钟
+    """
+    acted_at = dt_fromisoformat(item["meta"]["acted_at"]).replace(
+        second=0, microsecond=0
+    )
+    r = parse.urlparse(item["target"]["link"])
+    link = f"{r.netloc}{r.path}".rstrip("/")
+    raw = f"{item['meta']['action']}|{link}|{acted_at.isoformat()}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class SeenIndex(abc.ABC):
+    """
+    已抓取动态的索引，按人存储动态指纹及动态时间，超出保留天数的记录会被清理
+    """
+
+    def __init__(self, retention_days: int = 30):
+        self.retention_days = retention_days
+
+    @property
+    def expire_before(self) -> datetime:
+        return datetime.now() - timedelta(days=self.retention_days)
+
+    @abc.abstractmethod
+    async def recent(self, people: str, since: datetime) -> set[str]:
+        """动态时间不早于since的所有指纹"""
+
+    @abc.abstractmethod
+    async def acted_ats(self, people: str, since: datetime) -> list[float]:
+        """动态时间不早于since的所有动态时间戳"""
+
+    @abc.abstractmethod
+    async def add(self, people: str, items: Iterable[ActivityItem]):
+        pass
+
+    @abc.abstractmethod
+    async def prune(self, people: str):
+        pass
+
+
+class RedisSeenIndex(SeenIndex):
+    key_prefix = BaseWorker.redis_key_prefix
+
+    def __init__(self, redis: aioredis.Redis, retention_days: int = 30):
+        super().__init__(retention_days)
+        self.redis = redis
+
+    def get_key(self, people: str) -> str:
+        return f"{self.key_prefix}:{people}:seen"  # sorted set, score为动态时间戳
+
+    async def recent(self, people: str, since: datetime) -> set[str]:
+        return set(
+            await self.redis.zrangebyscore(
+                self.get_key(people), since.timestamp(), "+inf"
+            )
+        )
+
+    async def acted_ats(self, people: str, since: datetime) -> list[float]:
+        return [
+            score
+            for _, score in await self.redis.zrangebyscore(
+                self.get_key(people), since.timestamp(), "+inf", withscores=True
+            )
+        ]
+
+    async def add(self, people: str, items: Iterable[ActivityItem]):
+        mapping = {
+            activity_fingerprint(item): dt_fromisoformat(
+                item["meta"]["acted_at"]
+            ).timestamp()
+            for item in items
+        }
+        if mapping:
+            await self.redis.zadd(self.get_key(people), mapping)
+
+    async def prune(self, people: str):
+        await self.redis.zremrangebyscore(
+            self.get_key(people), "-inf", f"({self.expire_before.timestamp()}"
+        )
+
+
+class SQLiteSeenIndex(SeenIndex):
+    def __init__(self, path: str | pathlib.Path, retention_days: int = 30):
+        super().__init__(retention_days)
+        self.path = pathlib.Path(path)
+        self._conn: sqlite3.Connection | None = None
+        self._lock = asyncio.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen ("
+                "people TEXT NOT NULL, fingerprint TEXT NOT NULL, acted_at REAL NOT NULL, "
+                "PRIMARY KEY (people, fingerprint))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS seen_people_acted_at ON seen (people, acted_at)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _recent(self, people: str, since: datetime) -> set[str]:
+        rows = self._connect().execute(
+            "SELECT fingerprint FROM seen WHERE people = ? AND acted_at >= ?",
+            (people, since.timestamp()),
+        )
+        return {row[0] for row in rows}
+
+    def _acted_ats(self, people: str, since: datetime) -> list[float]:
+        rows = self._connect().execute(
+            "SELECT acted_at FROM seen WHERE people = ? AND acted_at >= ?",
+            (people, since.timestamp()),
+        )
+        return [row[0] for row in rows]
+
+    def _add(self, people: str, items: list[ActivityItem]):
+        conn = self._connect()
+        conn.executemany(
+            "INSERT OR REPLACE INTO seen (people, fingerprint, acted_at) VALUES (?, ?, ?)",
+            [
+                (
+                    people,
+                    activity_fingerprint(item),
+                    dt_fromisoformat(item["meta"]["acted_at"]).timestamp(),
+                )
+                for item in items
+            ],
+        )
+        conn.commit()
+
+    def _prune(self, people: str):
+        conn = self._connect()
+        conn.execute(
+            "DELETE FROM seen WHERE people = ? AND acted_at < ?",
+            (people, self.expire_before.timestamp()),
+        )
+        conn.commit()
+
+    async def recent(self, people: str, since: datetime) -> set[str]:
+        async with self._lock:
+            return await asyncio.to_thread(self._recent, people, since)
+
+    async def acted_ats(self, people: str, since: datetime) -> list[float]:
+        async with self._lock:
+            return await asyncio.to_thread(self._acted_ats, people, since)
+
+    async def add(self, people: str, items: Iterable[ActivityItem]):
+        async with self._lock:
+            await asyncio.to_thread(self._add, people, list(items))
+
+    async def prune(self, people: str):
+        async with self._lock:
+            await asyncio.to_thread(self._prune, people)
+
+
+def get_seen_index(
+    backend: str, redis: aioredis.Redis, path: str | pathlib.Path, retention_days: int
+) -> SeenIndex | None:
+    if backend == "redis":
+        return RedisSeenIndex(redis, retention_days)
+    elif backend == "sqlite":
+        return SQLiteSeenIndex(path, retention_days)
+    return None
@@ -0,0 +1,79 @@
+import gzip
+import html
+import importlib.util
+import typing
+from enum import Enum
+from typing import Any
+
+from archive.utils.js import extract_content_js
+
+if typing.TYPE_CHECKING:
+    from playwright.async_api import Page
+
+
+class Artifact(str, Enum):
+    SCREENSHOT = "screenshot"  # 截图
+    HTML = "html"  # 正文容器的HTML
+    MHTML = "mhtml"  # 整个页面的MHTML，仅Chromium
+    TEXT = "text"  # 正文纯文本
+
+
+class Compression(str, Enum):
+    NONE = "none"
+    GZIP = "gzip"
+    ZSTD = "zstd"  # 需要安装zstandard
+
+    @property
+    def suffix(self) -> str:
+        return {
+            Compression.NONE: "",
+            Compression.GZIP: ".gz",
+            Compression.ZSTD: ".zst",
+        }[self]
+
+    @classmethod
+    def parse(cls, value: "str | Compression") -> "Compression":
+        """配置的压缩方式，所需的库未安装时抛出ValueError，在加载配置时而不是压缩时出错"""
+        compression = cls(value)
+        if compression == cls.ZSTD and importlib.util.find_spec("zstandard") is None:
+            raise ValueError("zstd compression requires zstandard to be installed")
+        return compression
+
+    def compress(self, data: bytes) -> bytes:
+        if self == Compression.GZIP:
+            return gzip.compress(data, compresslevel=6)
+        if self == Compression.ZSTD:
+            import zstandard
+
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        return data
+
+
+# 正文容器，依次尝试
+ANSWER_CONTENT_SELECTORS = ["div.QuestionAnswer-content", "div.AnswerCard"]
+ARTICLE_CONTENT_SELECTORS = ["article.Post-Main", "div.Post-RichTextContainer"]
+
+
+async def extract_content(page: "Page", selectors: list[str]) -> dict[str, Any]:
+    """一次evaluate提取正文容器的HTML和纯文本，返回{selector, html, text}"""
+    return await page.evaluate(extract_content_js, selectors)
+
+
+def wrap_html(content: str, title: str, url: str) -> str:
+    """将正文容器的HTML包装为独立的文档，相对链接按原页面解析"""
+    return (
+        "<!DOCTYPE html>\n"
+        '<html><head><meta charset="utf-8">'
+        f'<base href="{html.escape(url)}"><title>{html.escape(title)}</title></head>\n'
+        f"<body>{content}</body></html>\n"
+    )
+
+
+async def capture_mhtml(page: "Page") -> str:
+    """通过CDP的Page.captureSnapshot获取整个页面的MHTML，仅Chromium支持"""
+    session = await page.context.new_cdp_session(page)
+    try:
+        result = await session.send("Page.captureSnapshot", {"format": "mhtml"})
+    finally:
+        await session.detach()
+    return result["data"]
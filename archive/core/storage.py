@@ -0,0 +1,289 @@
+import abc
+import asyncio
+import contextlib
+import mimetypes
+import pathlib
+from functools import lru_cache
+from typing import AsyncIterator
+
+import aiofiles
+
+from archive.config import settings
+from archive.core.blobs import get_blob_store
+
+
+class StorageWriter(abc.ABC):
+    """分块写入同一个对象"""
+
+    @abc.abstractmethod
+    async def write(self, data: bytes):
+        pass
+
+    @abc.abstractmethod
+    async def close(self):
+        """写入完成"""
+
+    async def abort(self):
+        """放弃写入"""
+
+
+class Storage(abc.ABC):
+    """
+    结果存储，Monitor和Archiver通过它写入截图、快照和记录
+
+    对象以相对results_dir的POSIX路径（key）标识，如`someone/archives/2023/09/01/<标题>/info.json`。
+    """
+
+    # 是否为本地目录，不是时Worker不会在本地创建结果目录
+    local = True
+
+    @abc.abstractmethod
+    def url(self, key: str) -> str:
+        """对象的位置，用于日志和存档目录"""
+
+    @abc.abstractmethod
+    def writer(self, key: str) -> StorageWriter:
+        pass
+
+    @contextlib.asynccontextmanager
+    async def open(self, key: str) -> AsyncIterator[StorageWriter]:
+        writer = self.writer(key)
+        try:
+            yield writer
+        except BaseException:
+            await writer.abort()
+            raise
+        await writer.close()
+
+    async def write(self, key: str, data: bytes, dedupe: bool = False) -> str:
+        """整块写入，`dedupe`为截图等可按内容去重的对象，由支持的存储自行处理"""
+        async with self.open(key) as writer:
+            await writer.write(data)
+        return self.url(key)
+
+    async def close(self):
+        pass
+
+
+class LocalFileWriter(StorageWriter):
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self.tmp = path.with_name(f".{path.name}.tmp")
+        self._fp = None
+
+    async def write(self, data: bytes):
+        if self._fp is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fp = await aiofiles.open(self.tmp, "wb")
+        await self._fp.write(data)
+
+    async def close(self):
+        if self._fp is None:
+            await self.write(b"")
+        await self._fp.close()
+        self.tmp.replace(self.path)
+
+    async def abort(self):
+        if self._fp is not None:
+            await self._fp.close()
+            self.tmp.unlink(missing_ok=True)
+
+
+class LocalStorage(Storage):
+    """本地目录，开启blob_store_enabled时截图（`dedupe`）按内容存储"""
+
+    def __init__(self, root: str | pathlib.Path):
+        self.root = pathlib.Path(root)
+
+    def path(self, key: str) -> pathlib.Path:
+        return self.root.joinpath(key)
+
+    def url(self, key: str) -> str:
+        return str(self.path(key))
+
+    def writer(self, key: str) -> StorageWriter:
+        return LocalFileWriter(self.path(key))
+
+    async def write(self, key: str, data: bytes, dedupe: bool = False) -> str:
+        if dedupe and (blob_store := get_blob_store()):
+            return str(await blob_store.store(self.path(key), data))
+        return await super().write(key, data)
+
+
+class S3MultipartWriter(StorageWriter):
+    """
+    S3分段上传：缓冲区满`part_size`后作为一段上传，同时最多上传`max_inflight`段，
+    内存占用不超过(max_inflight + 1) * part_size。总大小不足一段时使用一次PutObject
+    """
+
+    def __init__(self, storage: "S3Storage", key: str):
+        self.storage = storage
+        self.key = storage.object_key(key)
+        self.part_size = storage.part_size
+        self.content_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+        self._buffer = bytearray()
+        self._upload_id: str | None = None
+        self._parts: dict[int, str] = {}  # 段号 -> ETag
+        self._tasks: list[asyncio.Task] = []
+        self._inflight = asyncio.Semaphore(max(1, storage.max_inflight))
+
+    async def write(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            n = min(self.part_size - len(self._buffer), len(view))
+            self._buffer += view[:n]
+            view = view[n:]
+            if len(self._buffer) >= self.part_size:
+                await self._flush()
+
+    async def _flush(self):
+        client = await self.storage.client()
+        if self._upload_id is None:
+            response = await client.create_multipart_upload(
+                Bucket=self.storage.bucket, Key=self.key, ContentType=self.content_type
+            )
+            self._upload_id = response["UploadId"]
+        part_number = len(self._tasks) + 1
+        body = bytes(self._buffer)
+        self._buffer.clear()
+        # 等待有空闲的上传名额，限制同时在内存中的分段数
+        await self._inflight.acquire()
+        self._tasks.append(
+            asyncio.create_task(self._upload_part(client, part_number, body))
+        )
+
+    async def _upload_part(self, client, part_number: int, body: bytes):
+        try:
+            response = await client.upload_part(
+                Bucket=self.storage.bucket,
+                Key=self.key,
+                UploadId=self._upload_id,
+                PartNumber=part_number,
+                Body=body,
+            )
+            self._parts[part_number] = response["ETag"]
+        finally:
+            self._inflight.release()
+
+    async def close(self):
+        client = await self.storage.client()
+        if self._upload_id is None:
+            await client.put_object(
+                Bucket=self.storage.bucket,
+                Key=self.key,
+                Body=bytes(self._buffer),
+                ContentType=self.content_type,
+            )
+            return
+        if self._buffer:
+            await self._flush()
+        try:
+            await asyncio.gather(*self._tasks)
+        except BaseException:
+            await self.abort()
+            raise
+        await client.complete_multipart_upload(
+            Bucket=self.storage.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            MultipartUpload={
+                "Parts": [
+                    {"PartNumber": n, "ETag": etag}
+                    for n, etag in sorted(self._parts.items())
+                ]
+            },
+        )
+
+    async def abort(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self._upload_id is not None:
+            client = await self.storage.client()
+            with contextlib.suppress(Exception):
+                await client.abort_multipart_upload(
+                    Bucket=self.storage.bucket, Key=self.key, UploadId=self._upload_id
+                )
+            self._upload_id = None
+
+
+class S3Storage(Storage):
+    """
+    S3兼容的对象存储（AWS S3、MinIO等），需要安装aiobotocore
+    """
+
+    local = False
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: str = None,
+        access_key: str = None,
+        secret_key: str = None,
+        region: str = None,
+        part_size: int = 8 * 1024 * 1024,
+        max_inflight: int = 4,
+    ):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.endpoint_url = endpoint_url
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        # S3要求除最后一段外每段不小于5MiB
+        self.part_size = max(part_size, 5 * 1024 * 1024)
+        self.max_inflight = max_inflight
+        self._client = None
+        self._exit_stack: contextlib.AsyncExitStack | None = None
+        self._lock = asyncio.Lock()
+
+    def object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def url(self, key: str) -> str:
+        return f"s3://{self.bucket}/{self.object_key(key)}"
+
+    def writer(self, key: str) -> StorageWriter:
+        return S3MultipartWriter(self, key)
+
+    async def client(self):
+        async with self._lock:
+            if self._client is None:
+                from aiobotocore.session import get_session
+
+                self._exit_stack = contextlib.AsyncExitStack()
+                self._client = await self._exit_stack.enter_async_context(
+                    get_session().create_client(
+                        "s3",
+                        endpoint_url=self.endpoint_url,
+                        aws_access_key_id=self.access_key,
+                        aws_secret_access_key=self.secret_key,
+                        region_name=self.region,
+                    )
+                )
+            return self._client
+
+    async def close(self):
+        async with self._lock:
+            if self._exit_stack is not None:
+                await self._exit_stack.aclose()
+            self._client = self._exit_stack = None
+
+
+@lru_cache
+def get_storage(root: pathlib.Path = settings.results_dir) -> Storage:
+    """同一进程中的Worker共享一个Storage，`root`为本地存储的目录"""
+    if settings.storage_backend == "s3":
+        return S3Storage(
+            settings.s3_bucket,
+            settings.s3_prefix,
+            settings.s3_endpoint_url,
+            settings.s3_access_key,
+            settings.s3_secret_key,
+            settings.s3_region,
+            settings.s3_part_size,
+            settings.s3_max_inflight_parts,
+        )
+    return LocalStorage(root)
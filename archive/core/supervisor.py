@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from multiprocessing.process import BaseProcess
+
+from archive.config import default, settings
+
+logger = logging.getLogger("default")
+
+ARCHIVER = "archiver"
+MONITOR = "monitor"
+LOGIN_WORKER = "login_worker"
+
+
+def get_worker(kind: str, index: int = 0, total: int = 1):
+    """创建子进程中运行的Worker，与run_*.py中的一致"""
+    from archive.core.archiver import Archiver
+    from archive.core.login import ZhiLogin
+    from archive.core.monitor import Monitor, MultiMonitor
+
+    state_path = settings.states_dir.joinpath(default.state_file)
+    if kind == ARCHIVER:
+        return Archiver(settings.people, state_path, interval=1)
+    elif kind == MONITOR:
+        fetch_until = datetime.now() - timedelta(days=settings.monitor_fetch_until)
+        if settings.monitor_people:
+            return MultiMonitor(
+                settings.monitor_people[index::total],
+                state_path,
+                fetch_until=fetch_until,
+                interval=settings.monitor_interval,
+            )
+        return Monitor(
+            settings.people,
+            state_path,
+            fetch_until=fetch_until,
+            interval=settings.monitor_interval,
+        )
+    elif kind == LOGIN_WORKER:
+        return ZhiLogin(headless=settings.login_worker_headless)
+    raise ValueError(f"Unknown worker: {kind}")
+
+
+async def serve(kind: str, index: int = 0, total: int = 1):
+    worker = get_worker(kind, index, total)
+    loop = asyncio.get_running_loop()
+    main_task = asyncio.current_task()
+
+    def on_terminate():
+        # 支持优雅退出的Worker完成当前任务后退出，其他的直接取消
+        if hasattr(worker, "stop"):
+            worker.stop()
+        else:
+            main_task.cancel()
+
+    loop.add_signal_handler(signal.SIGTERM, on_terminate)
+    # Ctrl+C会发送给整个进程组，由Supervisor统一发送SIGTERM
+    loop.add_signal_handler(signal.SIGINT, lambda: None)
+    try:
+        if kind == LOGIN_WORKER:
+            await worker.run()
+        else:
+            await worker.run(headless=getattr(settings, f"{kind}_headless"))
+    except asyncio.CancelledError:
+        pass
+
+
+def run_worker(kind: str, index: int, total: int, cpus: set[int] | None):
+    """子进程入口"""
+    if cpus and hasattr(os, "sched_setaffinity"):
+        # 浏览器进程由Worker启动，会继承同样的CPU亲和性
+        os.sched_setaffinity(0, cpus)
+    asyncio.run(serve(kind, index, total))
+
+
+@dataclass
+class WorkerProcess:
+    kind: str
+    index: int = 0
+    total: int = 1
+    cpus: set[int] | None = None
+    process: BaseProcess | None = None
+    started_at: float = 0
+    failures: int = 0
+    restart_at: float = 0
+
+    @property
+    def name(self):
+        return f"{self.kind}-{self.index}"
+
+
+class Supervisor:
+    """
+    多进程运行Archiver、Monitor和登录Worker
+
+    - 每个Archiver/Monitor进程绑定到一个CPU核心（轮流分配）
+    - 子进程异常退出后按指数退避重启，运行超过`healthy_uptime`秒后重置
+    - 收到SIGTERM/SIGINT时向所有子进程发送SIGTERM，等待它们完成当前任务后退出，
+      超过`stop_timeout`秒仍未退出的强制结束
+    """
+
+    def __init__(
+        self,
+        archivers: int = settings.supervisor_archivers,
+        monitors: int = settings.supervisor_monitors,
+        login_worker: bool = settings.supervisor_login_worker,
+        cpu_affinity: bool = settings.supervisor_cpu_affinity,
+        restart_backoff: float = settings.supervisor_restart_backoff,
+        restart_backoff_max: float = settings.supervisor_restart_backoff_max,
+        healthy_uptime: int = settings.supervisor_healthy_uptime,
+        stop_timeout: int = settings.supervisor_stop_timeout,
+    ):
+        self.restart_backoff = restart_backoff
+        self.restart_backoff_max = restart_backoff_max
+        self.healthy_uptime = healthy_uptime
+        self.stop_timeout = stop_timeout
+        # 多用户监测时每个Monitor进程负责一部分用户，进程数不超过用户数
+        if settings.monitor_people:
+            monitors = min(monitors, len(settings.monitor_people))
+        else:
+            monitors = min(monitors, 1)
+        self.workers = [
+            WorkerProcess(ARCHIVER, i, archivers) for i in range(archivers)
+        ] + [WorkerProcess(MONITOR, i, monitors) for i in range(monitors)]
+        if cpu_affinity:
+            cpus = self.available_cpus()
+            for i, worker in enumerate(self.workers):
+                worker.cpus = {cpus[i % len(cpus)]}
+        if login_worker:
+            self.workers.append(WorkerProcess(LOGIN_WORKER))
+        self._mp = multiprocessing.get_context("spawn")
+        self._stopping = False
+
+    @staticmethod
+    def available_cpus() -> list[int]:
+        if hasattr(os, "sched_getaffinity"):
+            return sorted(os.sched_getaffinity(0))
+        return list(range(os.cpu_count() or 1))
+
+    def start(self, worker: WorkerProcess):
+        worker.process = self._mp.Process(
+            target=run_worker,
+            args=(worker.kind, worker.index, worker.total, worker.cpus),
+            name=worker.name,
+        )
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        logger.info(
+            f"Started {worker.name}, pid: {worker.process.pid}, cpus: {worker.cpus}"
+        )
+
+    def check(self, worker: WorkerProcess):
+        now = time.monotonic()
+        if worker.process is None:
+            if now >= worker.restart_at:
+                self.start(worker)
+            return
+        if worker.process.is_alive():
+            return
+        exitcode = worker.process.exitcode
+        worker.process.close()
+        worker.process = None
+        if now - worker.started_at >= self.healthy_uptime:
+            worker.failures = 0
+        worker.failures += 1
+        delay = min(
+            self.restart_backoff_max,
+            self.restart_backoff * 2 ** (worker.failures - 1),
+        )
+        worker.restart_at = now + delay
+        logger.warning(
+            f"{worker.name} exited with code {exitcode}, restart in {delay:.1f}s"
+        )
+
+    def handle_signal(self, signum, frame):
+        logger.info(f"Received signal {signal.Signals(signum).name}, stopping")
+        self._stopping = True
+
+    def drain(self):
+        alive = [w for w in self.workers if w.process and w.process.is_alive()]
+        for worker in alive:
+            worker.process.terminate()
+        deadline = time.monotonic() + self.stop_timeout
+        for worker in alive:
+            worker.process.join(max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                logger.warning(f"{worker.name} did not stop in time, kill it")
+                worker.process.kill()
+                worker.process.join()
+            logger.info(f"{worker.name} stopped")
+
+    def run(self, check_interval: float = 0.5):
+        signal.signal(signal.SIGTERM, self.handle_signal)
+        signal.signal(signal.SIGINT, self.handle_signal)
+        logger.info(f"Supervisor started, workers: {[w.name for w in self.workers]}")
+        try:
+            while not self._stopping:
+                for worker in self.workers:
+                    self.check(worker)
+                time.sleep(check_interval)
+        finally:
+            self.drain()
+        logger.info("Supervisor stopped")
@@ -16,6 +16,7 @@ def configure_logger(name, max_bytes=1024 * 1024 * 5):
         maxBytes=max_bytes,
         backupCount=10,
         encoding="utf-8",
+        delay=True,  # 首次写入时才打开文件，API等进程不会打开用不到的日志文件
     )
     file_handler.setFormatter(verbose_formatter)
     logger.addHandler(file_handler)
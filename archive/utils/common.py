@@ -1,5 +1,6 @@
 import uuid
 from datetime import datetime
+from urllib import parse
 
 from pathvalidate import (
     ErrorReason,
@@ -24,6 +25,12 @@ def dt_toisoformat(dt: datetime) -> str:
     return dt.isoformat()
 
 
+def get_target_url(link: str) -> str:
+    """动态中的目标链接（可能省略协议）转为完整地址"""
+    r = parse.urlparse(link)
+    return "https://" + "".join(r[1:])
+
+
 def get_validate_filename(filename: str, safe_cn_length=50) -> str:
     """
     知乎的文章标题最多100个汉字
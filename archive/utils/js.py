@@ -21,3 +21,90 @@ async () => {
 }"""
 get_page_scrollHeight = "() => document.documentElement.scrollHeight"
 get_page_scrollWidth = "() => document.documentElement.scrollWidth"
+
+# 一次性提取动态列表中从start开始的所有条目
+extract_activity_items_js = """
+([itemSelector, start]) => Array.from(document.querySelectorAll(itemSelector)).slice(start).map(item => {
+  const metaTexts = Array.from(item.querySelectorAll("div.ActivityItem-meta span")).map(e => e.textContent);
+  const sticky = Array.from(
+    item.querySelectorAll("div.ContentItem span.ActivityItem-StickyMark")
+  ).some(e => e.textContent.includes("置顶"));
+  const target = item.querySelector("div.ContentItem");
+  const link = target && target.querySelector("h2 a[target=_blank]");
+  const author = target && target.querySelector(
+    "div.ContentItem-meta div.AuthorInfo div.AuthorInfo-content span.UserLink a.UserLink-link"
+  );
+  return {
+    metaTexts,
+    sticky,
+    title: link ? link.textContent : null,
+    link: link ? link.getAttribute("href") : null,
+    author: author ? author.getAttribute("href") : null,
+  };
+})"""
+
+# 逐个滚动图片触发懒加载，等待图片加载并解码完成，最多等待timeout毫秒。返回{total, pending}
+wait_images_ready_js = """
+async ([selector, timeout]) => {
+  const deadline = Date.now() + timeout;
+  const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+  // 后台标签页中requestAnimationFrame可能不触发
+  const nextFrame = () => Promise.race([new Promise(r => requestAnimationFrame(r)), sleep(50)]);
+  const imgs = Array.from(document.querySelectorAll(selector));
+  for (const img of imgs) {
+    if (Date.now() > deadline) break;
+    img.scrollIntoView({block: "center"});
+    await nextFrame();
+  }
+  // 知乎的懒加载图片在进入可见区域后才将src替换为data-actualsrc
+  const loaded = img => img.complete && !(img.dataset.actualsrc && img.src !== img.dataset.actualsrc);
+  let pending = imgs.filter(img => !loaded(img));
+  while (pending.length && Date.now() < deadline) {
+    await sleep(50);
+    pending = pending.filter(img => !loaded(img));
+  }
+  await Promise.race([
+    Promise.all(imgs.map(img => img.decode().catch(() => {}))),
+    sleep(Math.max(0, deadline - Date.now())),
+  ]);
+  return {total: imgs.length, pending: pending.length};
+}"""
+
+# DOM在quiet毫秒内没有变化时返回true，超过timeout毫秒仍在变化时返回false
+wait_dom_settled_js = """
+([quiet, timeout]) => new Promise(resolve => {
+  let timer = null;
+  const done = settled => {
+    observer.disconnect();
+    clearTimeout(timer);
+    clearTimeout(cap);
+    resolve(settled);
+  };
+  const observer = new MutationObserver(() => {
+    clearTimeout(timer);
+    timer = setTimeout(done, quiet, true);
+  });
+  const cap = setTimeout(done, timeout, false);
+  observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+  timer = setTimeout(done, quiet, true);
+})"""
+
+# 一次提取正文容器（第一个匹配的选择器，都不匹配时为body）的HTML和纯文本
+# HTML中去掉脚本，并将懒加载图片的地址替换为实际地址。返回{selector, html, text}
+extract_content_js = """
+(selectors) => {
+  let selector = null;
+  let container = null;
+  for (const s of selectors) {
+    container = document.querySelector(s);
+    if (container) {
+      selector = s;
+      break;
+    }
+  }
+  container = container || document.body;
+  const clone = container.cloneNode(true);
+  clone.querySelectorAll("script, noscript").forEach(e => e.remove());
+  clone.querySelectorAll("img[data-actualsrc]").forEach(img => img.setAttribute("src", img.dataset.actualsrc));
+  return {selector, html: clone.outerHTML, text: container.innerText};
+}"""
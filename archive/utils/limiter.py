@@ -0,0 +1,25 @@
+import asyncio
+import time
+
+
+class RateLimiter:
+    """
+    速率限制
+
+    每秒最多放行`rate`次，`rate`不大于0时不限制
+    """
+
+    def __init__(self, rate: float = 0):
+        self.rate = rate
+        self._next_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_at - now
+            self._next_at = max(now, self._next_at) + 1 / self.rate
+        if delay > 0:
+            await asyncio.sleep(delay)
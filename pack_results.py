@@ -0,0 +1,55 @@
+import argparse
+import logging
+from datetime import date, timedelta
+
+from archive.config import settings
+from archive.core.blobs import get_blob_store
+from archive.core.packs import (
+    PackError,
+    find_day_dirs,
+    find_packs,
+    pack_day,
+    verify_day,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """将早于pack_after_days天的日期目录打包，校验通过后删除未打包的文件"""
+    parser = argparse.ArgumentParser(description="打包结果目录中的历史日期目录")
+    parser.add_argument("--days", type=int, default=settings.pack_after_days)
+    parser.add_argument("--keep", action="store_true", help="打包后保留未打包的文件")
+    parser.add_argument("--verify", action="store_true", help="只校验已有的包")
+    args = parser.parse_args()
+    logging.basicConfig(level=settings.log_level)
+
+    results_dir = settings.results_dir
+    if args.verify:
+        failed = 0
+        packs = find_packs(results_dir)
+        for pack in packs:
+            day_dir = pack.with_suffix("")
+            if errors := verify_day(results_dir, day_dir):
+                failed += 1
+                logger.error(f"{pack}: {errors}")
+        logger.info(f"Verified {len(packs)} packs, {failed} failed")
+        return
+
+    blob_store = get_blob_store()
+    before = date.today() - timedelta(days=args.days)
+    for day_dir in find_day_dirs(results_dir, before):
+        try:
+            pack_day(
+                results_dir,
+                day_dir,
+                blob_store,
+                delete=not args.keep,
+                grace_period=settings.pack_grace_period,
+            )
+        except PackError as e:
+            logger.error(e)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+from archive.config import settings
+from archive.core.catalog import Catalog
+
+
+def main():
+    """从结果目录重建存档目录（catalog_path）及全文索引，会清空已有记录"""
+    catalog = Catalog(settings.catalog_path, settings.search_enabled)
+    count = catalog.rebuild(settings.results_dir)
+    print(f"Rebuilt {count} items into {settings.catalog_path}")
+
+
+if __name__ == "__main__":
+    main()
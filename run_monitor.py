@@ -2,10 +2,17 @@ import asyncio
 from datetime import datetime, timedelta
 
 from archive.config import default, settings
-from archive.core.monitor import Monitor
+from archive.core.monitor import Monitor, MultiMonitor
 
 
 def get_monitor():
+    if settings.monitor_people:
+        return MultiMonitor(
+            settings.monitor_people,
+            settings.states_dir.joinpath(default.state_file),
+            fetch_until=datetime.now() - timedelta(days=settings.monitor_fetch_until),
+            interval=settings.monitor_interval,
+        )
     return Monitor(
         settings.people,
         settings.states_dir.joinpath(default.state_file),
@@ -0,0 +1,10 @@
+from archive.core.supervisor import Supervisor
+
+
+def main():
+    supervisor = Supervisor()
+    supervisor.run()
+
+
+if __name__ == "__main__":
+    main()
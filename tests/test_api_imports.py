@@ -0,0 +1,15 @@
+import subprocess
+import sys
+
+
+def test_api_does_not_import_playwright():
+    # 在新进程中导入，避免受其他测试已导入的模块影响
+    code = (
+        "import sys; import archive.api.app; "
+        "assert 'playwright' not in sys.modules, 'playwright imported'; "
+        "assert 'PIL' not in sys.modules, 'PIL imported'"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
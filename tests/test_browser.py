@@ -0,0 +1,50 @@
+import json
+import os
+
+from archive.core.browser import StateVersion
+
+
+def write_state(path, cookies, origins=(), mtime=None):
+    path.write_text(json.dumps({"cookies": cookies, "origins": list(origins)}))
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def cookie(value, expires=1):
+    return {
+        "name": "z_c0",
+        "value": value,
+        "domain": ".zhihu.com",
+        "path": "/",
+        "expires": expires,
+    }
+
+
+def test_state_version_ignores_saves_with_same_cookies(tmp_path):
+    path = tmp_path.joinpath("state.json")
+    write_state(path, [cookie("a")], mtime=1000)
+    version = StateVersion(path)
+    assert not version.changed()
+    # 其他进程自动保存，只刷新了过期时间和localStorage
+    write_state(path, [cookie("a", expires=2)], [{"origin": "x"}], mtime=2000)
+    assert not version.changed()
+    assert version.mtime == os.stat(path).st_mtime
+
+
+def test_state_version_detects_new_cookies(tmp_path):
+    path = tmp_path.joinpath("state.json")
+    write_state(path, [cookie("a")], mtime=1000)
+    version = StateVersion(path)
+    write_state(path, [cookie("b")], mtime=2000)
+    assert version.changed()
+    assert version.changed()
+    version.refresh()
+    assert not version.changed()
+
+
+def test_state_version_missing_file(tmp_path):
+    path = tmp_path.joinpath("state.json")
+    version = StateVersion(path)
+    assert not version.changed()
+    write_state(path, [cookie("a")])
+    assert version.changed()
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from fakeredis import aioredis as fakeredis
+
+from archive.core.archiver import Archiver
+from archive.core.configs import ConfigError
+from archive.core.control import WorkerControl
+
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+@pytest.fixture
+def worker(tmp_path, redis):
+    return Archiver(people="someone", base_results_dir=tmp_path, redis=redis)
+
+
+@pytest.fixture
+def control(redis):
+    return WorkerControl(name=Archiver.name, redis=redis)
+
+
+def test_control_rejects_invalid_configs(worker, control):
+    async def main():
+        await worker.configurator.load_to_worker()
+        with pytest.raises(ConfigError):
+            await control.write_writeable_configs({"concurrency": "many"})
+        return await control.get_configs()
+
+    assert asyncio.run(main())["concurrency"] == worker.concurrency
+
+
+def test_sync_does_not_overwrite_newer_configs(worker, control):
+    async def main():
+        await worker.configurator.load_to_worker()
+        # 通知到达前控制端修改了配置，Worker不能用旧配置覆盖
+        await control.write_writeable_configs({"concurrency": 7})
+        worker.interval = 99
+        assert not await worker.configurator.sync_from_worker()
+        assert (await control.get_configs())["concurrency"] == 7
+        await worker.after_run()
+        return await control.get_configs()
+
+    assert asyncio.run(main())["concurrency"] == 7
+    assert worker.concurrency == 7
+
+
+def test_sync_writes_worker_configs_when_unchanged(worker, control):
+    async def main():
+        await worker.configurator.load_to_worker()
+        worker.interval = 123
+        assert await worker.configurator.sync_from_worker()
+        return await control.get_configs()
+
+    assert asyncio.run(main())["interval"] == 123
@@ -0,0 +1,56 @@
+import asyncio
+
+from fakeredis import aioredis as fakeredis
+
+from archive.core.fleet import ArchiverFleet, get_shard
+
+
+def test_get_shard_is_stable_and_in_range():
+    shards = [get_shard(f"people{i}", 8) for i in range(100)]
+    assert shards == [get_shard(f"people{i}", 8) for i in range(100)]
+    assert set(shards) <= set(range(8))
+    assert len(set(shards)) > 1
+
+
+def test_get_shard_without_sharding():
+    assert get_shard("someone", 1) == 0
+    assert get_shard(None, 8) == 0
+    assert get_shard("", 8) == 0
+
+
+def test_shards_are_split_among_members_and_rebalanced():
+    async def main():
+        redis = fakeredis.FakeRedis(decode_responses=True)
+        fleets = [ArchiverFleet(redis, "fleet", shards=8) for _ in range(3)]
+        for fleet in fleets:
+            await fleet.heartbeat()
+        assigned = [await fleet.assigned_shards() for fleet in fleets]
+        await fleets[0].leave()
+        rebalanced = [await fleet.assigned_shards() for fleet in fleets[1:]]
+        return assigned, rebalanced
+
+    assigned, rebalanced = asyncio.run(main())
+    for result in (assigned, rebalanced):
+        shards = [s for owned in result for s in owned]
+        assert sorted(shards) == list(range(8))
+    assert all(owned for owned in rebalanced)
+
+
+def test_member_not_registered_joins_on_assignment():
+    async def main():
+        redis = fakeredis.FakeRedis(decode_responses=True)
+        fleet = ArchiverFleet(redis, "fleet", shards=4)
+        return await fleet.assigned_shards(), await fleet.members()
+
+    assigned, members = asyncio.run(main())
+    assert assigned == [0, 1, 2, 3]
+    assert len(members) == 1
+
+
+def test_single_shard_is_shared_by_all_members():
+    async def main():
+        redis = fakeredis.FakeRedis(decode_responses=True)
+        fleets = [ArchiverFleet(redis, "fleet", shards=1) for _ in range(2)]
+        return [await fleet.assigned_shards() for fleet in fleets]
+
+    assert asyncio.run(main()) == [[0], [0]]
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import sqlite3
+import time
+
+import pytest
+
+from archive.core.blobs import BlobStore
+from archive.core.packs import (
+    list_files,
+    load_index,
+    pack_day,
+    pack_path,
+    read_file,
+    verify_day,
+)
+
+
+@pytest.fixture
+def results_dir(tmp_path):
+    return tmp_path.joinpath("results")
+
+
+@pytest.fixture
+def day_dir(results_dir):
+    day_dir = results_dir.joinpath("someone", "archives", "2023", "09", "01")
+    day_dir.mkdir(parents=True)
+    return day_dir
+
+
+def write(path, data: bytes, age: float = 3600):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+
+
+def relpath(results_dir, day_dir, name):
+    return day_dir.joinpath(name).relative_to(results_dir).as_posix()
+
+
+def test_pack_day_round_trip(results_dir, day_dir):
+    contents = {
+        "a/info.json": b'{"title": "a"}',
+        "a/a.html": "<p>内容</p>".encode("utf-8"),
+        "b/info.json": b"",
+    }
+    for name, data in contents.items():
+        write(day_dir.joinpath(name), data)
+    assert pack_day(results_dir, day_dir) == 3
+    assert not day_dir.exists()
+    assert pack_path(day_dir).is_file()
+    assert list_files(results_dir, day_dir) == sorted(contents)
+    for name, data in contents.items():
+        assert read_file(results_dir, relpath(results_dir, day_dir, name)) == data
+    assert read_file(results_dir, relpath(results_dir, day_dir, "missing")) is None
+    assert verify_day(results_dir, day_dir) == []
+
+
+def test_pack_day_merges_into_existing_pack(results_dir, day_dir):
+    write(day_dir.joinpath("a/info.json"), b"old")
+    write(day_dir.joinpath("b/info.json"), b"b")
+    pack_day(results_dir, day_dir)
+    write(day_dir.joinpath("a/info.json"), b"new")
+    write(day_dir.joinpath("c/info.json"), b"c")
+    assert pack_day(results_dir, day_dir) == 2
+    assert list_files(results_dir, day_dir) == [
+        "a/info.json",
+        "b/info.json",
+        "c/info.json",
+    ]
+    for name, data in [("a", b"new"), ("b", b"b"), ("c", b"c")]:
+        path = relpath(results_dir, day_dir, f"{name}/info.json")
+        assert read_file(results_dir, path) == data
+
+
+def test_pack_day_skips_temporary_files_and_recent_writes(results_dir, day_dir):
+    write(day_dir.joinpath("a/info.json"), b"a")
+    write(day_dir.joinpath("a/.a.png.tmp"), b"partial")
+    write(day_dir.joinpath("b/info.json"), b"b", age=0)
+    assert pack_day(results_dir, day_dir, grace_period=60) == 0
+    assert load_index(day_dir) is None
+    assert pack_day(results_dir, day_dir) == 2
+    assert day_dir.joinpath("a/.a.png.tmp").is_file()
+    assert "a/.a.png.tmp" not in load_index(day_dir)["files"]
+
+
+def test_blob_files_are_referenced_not_copied(results_dir, day_dir):
+    blob_store = BlobStore(results_dir.joinpath("blobs"))
+    screenshot = day_dir.joinpath("a/a.png")
+    data = b"\x89PNG" + os.urandom(64 * 1024)
+    asyncio.run(blob_store.store(screenshot, data))
+    write(day_dir.joinpath("a/info.json"), b"a")
+    os.utime(screenshot, (time.time() - 3600,) * 2)
+    assert pack_day(results_dir, day_dir, blob_store) == 2
+    entry = load_index(day_dir)["files"]["a/a.png"]
+    assert entry["blob"].startswith("blobs/")
+    assert pack_path(day_dir).stat().st_size < len(data)
+    assert read_file(results_dir, relpath(results_dir, day_dir, "a/a.png")) == data
+    with sqlite3.connect(blob_store.index_path) as conn:
+        (path,) = conn.execute("SELECT path FROM links").fetchone()
+    assert path == f"{pack_path(day_dir)}#a/a.png"
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+from fakeredis import aioredis as fakeredis
+
+from archive.core.queue import TaskQueue
+
+
+def make_queue(**kwargs) -> TaskQueue:
+    kwargs = {
+        "visibility_timeout": 600,
+        "max_retries": 2,
+        "retry_backoff": 0,
+        "reap_interval": 0,
+        **kwargs,
+    }
+    return TaskQueue(fakeredis.FakeRedis(decode_responses=True), "tasks", **kwargs)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_pop_ack():
+    async def main():
+        queue = make_queue()
+        await queue.push("a", "b")
+        assert await queue.pop() == "a"
+        assert (await queue.stats())["processing"] == 1
+        await queue.ack("a")
+        assert await queue.pop() == "b"
+        await queue.ack("b")
+        assert await queue.pop() is None
+        return await queue.stats()
+
+    assert run(main()) == {"pending": 0, "processing": 0, "delayed": 0, "dead": 0}
+
+
+def test_release_puts_task_back_first_without_attempt():
+    async def main():
+        queue = make_queue()
+        await queue.push("a", "b")
+        await queue.release(await queue.pop())
+        assert await queue.redis.hget(queue.attempts_key, "a") is None
+        return await queue.pop()
+
+    assert run(main()) == "a"
+
+
+def test_fail_retries_then_moves_to_dead_list():
+    async def main():
+        queue = make_queue()
+        await queue.push("a")
+        for _ in range(queue.max_retries):
+            assert await queue.pop() == "a"
+            assert not await queue.fail("a")
+        assert await queue.pop() == "a"
+        assert await queue.fail("a")
+        assert await queue.pop() is None
+        assert await queue.dead_tasks() == ["a"]
+        assert await queue.redis.hget(queue.attempts_key, "a") is None
+        assert await queue.requeue_dead() == 1
+        return await queue.pop()
+
+    assert run(main()) == "a"
+
+
+def test_failed_task_waits_for_backoff():
+    async def main():
+        queue = make_queue(retry_backoff=60)
+        await queue.push("a")
+        await queue.fail(await queue.pop())
+        assert await queue.pop() is None
+        return await queue.stats()
+
+    assert run(main())["delayed"] == 1
+
+
+def test_ack_unknown_task_is_ignored():
+    async def main():
+        queue = make_queue()
+        assert not await queue.fail("missing")
+        await queue.ack("missing")
+        return await queue.stats()
+
+    assert run(main())["dead"] == 0
+
+
+def test_expired_lease_is_requeued_with_attempt():
+    async def main():
+        queue = make_queue(visibility_timeout=-1)
+        await queue.push("a")
+        assert await queue.pop() == "a"
+        assert await queue.pop() == "a"
+        return await queue.redis.hget(queue.attempts_key, "a")
+
+    assert run(main()) == "1"
+
+
+@pytest.mark.parametrize("force,expected", [(False, None), (True, "a")])
+def test_leases_are_reaped_at_most_every_interval(force, expected):
+    async def main():
+        queue = make_queue(visibility_timeout=-1, reap_interval=3600)
+        await queue.push("a")
+        assert await queue.pop() == "a"
+        await queue.requeue_due(force=force)
+        return await queue.pop()
+
+    assert run(main()) == expected
+
+
+def test_missing_lease_starts_timing_when_reaped():
+    async def main():
+        queue = make_queue()
+        await queue.redis.rpush(queue.processing_key, "a")
+        await queue.requeue_due(force=True)
+        return await queue.redis.hget(queue.leases_key, "a")
+
+    assert run(main()) is not None
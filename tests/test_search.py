@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from archive.core.catalog import Catalog
+from archive.core.search import index_text, match_query, tokenize
+
+
+def make_item(i: int, title: str) -> dict:
+    return {
+        "id": f"id{i:03d}",
+        "meta": {
+            "action": "赞同",
+            "target_type": "回答",
+            "acted_at": (datetime(2024, 1, 1) + timedelta(minutes=i)).isoformat(),
+        },
+        "target": {
+            "title": title,
+            "link": f"//www.zhihu.com/question/{i}",
+            "author": "someone",
+        },
+    }
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return Catalog(tmp_path.joinpath("catalog.sqlite3"))
+
+
+def search(catalog: Catalog, query: str, **kwargs):
+    return asyncio.run(catalog.search_items(query, **kwargs))
+
+
+def test_tokenize_cjk_bigrams_and_words():
+    assert tokenize("机器学习 Python_3") == ["机器", "器学", "学习", "python", "3"]
+    assert tokenize("学") == ["学"]
+
+
+def test_index_text_appends_cjk_chars_after_bigrams():
+    assert index_text("学习ab") == "学习 ab 学 习"
+
+
+def test_match_query():
+    assert match_query("机器学习 python") == '"机器 器学 学习" "python"'
+    assert match_query("习") == '"习"'
+    assert match_query("  ") is None
+
+
+def test_single_cjk_char_matches_end_of_run(catalog):
+    asyncio.run(catalog.add_items("someone", [make_item(1, "如何学习")]))
+    items, _ = search(catalog, "习")
+    assert [item["id"] for item in items] == ["id001"]
+    items, _ = search(catalog, "如")
+    assert [item["id"] for item in items] == ["id001"]
+
+
+def test_phrase_does_not_match_across_words(catalog):
+    asyncio.run(
+        catalog.add_items(
+            "someone", [make_item(1, "机器 学习"), make_item(2, "机器学习")]
+        )
+    )
+    items, _ = search(catalog, "机器学习")
+    assert [item["id"] for item in items] == ["id002"]
+
+
+def test_body_text_is_searchable(catalog):
+    item = make_item(1, "标题")
+    asyncio.run(
+        catalog.add_archive(
+            "someone", item, "/tmp/x", [], datetime.now(), text="正文里的内容"
+        )
+    )
+    items, _ = search(catalog, "内容")
+    assert [i["id"] for i in items] == ["id001"]
+
+
+@pytest.mark.parametrize("order", ["time", "relevance"])
+def test_cursor_pagination_covers_all_results_once(catalog, order):
+    asyncio.run(
+        catalog.add_items("someone", [make_item(i, f"学习笔记{i}") for i in range(7)])
+    )
+    seen, cursor = [], None
+    while True:
+        items, cursor = search(catalog, "学习", order=order, cursor=cursor, limit=3)
+        seen.extend(item["id"] for item in items)
+        if cursor is None:
+            break
+    assert sorted(seen) == [f"id{i:03d}" for i in range(7)]
+    assert len(seen) == len(set(seen))
+    if order == "time":
+        assert seen == [f"id{i:03d}" for i in reversed(range(7))]
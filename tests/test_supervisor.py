@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from archive.core.supervisor import ARCHIVER, Supervisor
+
+
+class ExitedProcess:
+    exitcode = 1
+
+    def is_alive(self):
+        return False
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def supervisor(monkeypatch):
+    supervisor = Supervisor(
+        archivers=1,
+        monitors=0,
+        login_worker=False,
+        cpu_affinity=False,
+        restart_backoff=1,
+        restart_backoff_max=5,
+        healthy_uptime=60,
+    )
+    started = []
+    monkeypatch.setattr(supervisor, "start", started.append)
+    supervisor.started = started
+    return supervisor
+
+
+def crash(supervisor: Supervisor, uptime: float = 0) -> float:
+    """让唯一的子进程在运行`uptime`秒后退出，返回重启前的等待时间"""
+    worker = supervisor.workers[0]
+    worker.process = ExitedProcess()
+    worker.started_at = time.monotonic() - uptime
+    supervisor.check(worker)
+    assert worker.process is None
+    return worker.restart_at - time.monotonic()
+
+
+def test_restart_backoff_doubles_and_is_capped(supervisor):
+    assert supervisor.workers[0].kind == ARCHIVER
+    delays = [crash(supervisor) for _ in range(5)]
+    assert [round(d) for d in delays] == [1, 2, 4, 5, 5]
+
+
+def test_backoff_resets_after_healthy_uptime(supervisor):
+    crash(supervisor)
+    crash(supervisor)
+    assert round(crash(supervisor, uptime=60)) == 1
+    assert supervisor.workers[0].failures == 1
+
+
+def test_restart_waits_for_backoff(supervisor):
+    worker = supervisor.workers[0]
+    crash(supervisor)
+    supervisor.check(worker)
+    assert supervisor.started == []
+    worker.restart_at = time.monotonic()
+    supervisor.check(worker)
+    assert supervisor.started == [worker]